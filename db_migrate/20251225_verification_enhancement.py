@@ -1,15 +1,30 @@
-import sqlite3
 import logging
 
+from src.utils.db_helper import open_db
+
 logger = logging.getLogger()
 
+# True once every step below has been applied, letting re-runs return after one read
+APPLIED_PROBE = """
+    SELECT (SELECT COUNT(*) FROM sqlite_master
+            WHERE type = 'table' AND name IN ('verification_attempts', 'appeal_requests')) = 2
+       AND EXISTS (SELECT 1 FROM pragma_table_info('blocked_users') WHERE name = 'block_reason')
+       AND (SELECT COUNT(DISTINCT key) FROM settings
+            WHERE key IN ('appeal_mode', 'captcha_image_enabled')) = 2
+"""
+
 
 def upgrade(db_path):
-    with sqlite3.connect(db_path) as conn:
+    with open_db(db_path) as conn:
         db_cursor = conn.cursor()
+        if db_cursor.execute(APPLIED_PROBE).fetchone()[0]:
+            logger.info("Verification enhancement migration already applied")
+            return
 
-        # Create verification_attempts table
+        # Apply every schema step in one transaction so the migration commits once
+        db_cursor.execute("BEGIN")
         try:
+            # Create verification_attempts table
             db_cursor.execute("""
                 CREATE TABLE IF NOT EXISTS verification_attempts (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -20,14 +35,9 @@ def upgrade(db_path):
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
-            conn.commit()
             logger.info("Created verification_attempts table")
-        except Exception as e:
-            logger.error(f"Failed to create verification_attempts table: {e}")
-            conn.rollback()
 
-        # Create appeal_requests table
-        try:
+            # Create appeal_requests table
             db_cursor.execute("""
                 CREATE TABLE IF NOT EXISTS appeal_requests (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -39,52 +49,47 @@ def upgrade(db_path):
                     handled_at TIMESTAMP
                 )
             """)
-            conn.commit()
             logger.info("Created appeal_requests table")
-        except Exception as e:
-            logger.error(f"Failed to create appeal_requests table: {e}")
-            conn.rollback()
 
-        # Add block_reason column to blocked_users table
-        try:
-            # Check if column already exists
-            db_cursor.execute("PRAGMA table_info(blocked_users)")
-            columns = db_cursor.fetchall()
-            has_block_reason = any(col[1] == 'block_reason' for col in columns)
+            # Add block_reason column to blocked_users table
+            try:
+                # Check if column already exists
+                db_cursor.execute("PRAGMA table_info(blocked_users)")
+                columns = db_cursor.fetchall()
+                has_block_reason = any(col[1] == 'block_reason' for col in columns)
 
-            if not has_block_reason:
-                db_cursor.execute("""
-                    ALTER TABLE blocked_users
-                    ADD COLUMN block_reason TEXT DEFAULT 'manual'
-                """)
-                conn.commit()
-                logger.info("Added block_reason column to blocked_users table")
-            else:
-                logger.info("block_reason column already exists in blocked_users table")
-        except Exception as e:
-            logger.error(f"Failed to add block_reason column to blocked_users table: {e}")
-            conn.rollback()
+                if not has_block_reason:
+                    db_cursor.execute("""
+                        ALTER TABLE blocked_users
+                        ADD COLUMN block_reason TEXT DEFAULT 'manual'
+                    """)
+                    logger.info("Added block_reason column to blocked_users table")
+                else:
+                    logger.info("block_reason column already exists in blocked_users table")
+            except Exception as e:
+                logger.error(f"Failed to add block_reason column to blocked_users table: {e}")
 
-        # Add appeal mode setting
-        try:
+            # Add appeal mode and image captcha settings in one statement. The
+            # settings table has no unique key, so skip keys that already exist.
             db_cursor.execute("""
-                INSERT OR IGNORE INTO settings (key, value)
-                VALUES ('appeal_mode', 'manual')
+                INSERT INTO settings (key, value)
+                SELECT defaults.column1, defaults.column2
+                FROM (VALUES ('appeal_mode', 'manual'),
+                             ('captcha_image_enabled', 'disable')) AS defaults
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM settings WHERE settings.key = defaults.column1
+                )
             """)
+            logger.info("Added appeal_mode and captcha_image_enabled settings")
+
             conn.commit()
-            logger.info("Added appeal_mode setting")
         except Exception as e:
-            logger.error(f"Failed to add appeal_mode setting: {e}")
+            logger.error(f"Failed to apply verification enhancement migration: {e}")
             conn.rollback()
+            raise
 
-        # Add image captcha setting
+        # Refresh query planner statistics for the new tables
         try:
-            db_cursor.execute("""
-                INSERT OR IGNORE INTO settings (key, value)
-                VALUES ('captcha_image_enabled', 'disable')
-            """)
-            conn.commit()
-            logger.info("Added captcha_image_enabled setting")
+            db_cursor.execute("PRAGMA optimize")
         except Exception as e:
-            logger.error(f"Failed to add captcha_image_enabled setting: {e}")
-            conn.rollback()
+            logger.warning(f"Failed to optimize database: {e}")
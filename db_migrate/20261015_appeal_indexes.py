@@ -0,0 +1,15 @@
+"""Add a covering index for appeal status lookups and refresh planner statistics."""
+
+import sqlite3
+
+
+def upgrade(db_path):
+    with sqlite3.connect(db_path) as connection:
+        cursor = connection.cursor()
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_appeal_user_status ON appeal_requests(user_id, status)"
+        )
+        cursor.execute("ANALYZE appeal_requests")
+        cursor.execute("ANALYZE blocked_users")
+        cursor.execute("ANALYZE verification_attempts")
+        connection.commit()
@@ -0,0 +1,20 @@
+"""Add covering indexes for resolving replies between users and topics."""
+
+import sqlite3
+
+
+def upgrade(db_path):
+    with sqlite3.connect(db_path) as connection:
+        cursor = connection.cursor()
+        # Each index ends with the column the reply lookup selects, so both
+        # directions are answered from the index without touching the table.
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_messages_received "
+            "ON messages(received_id, topic_id, in_group, forwarded_id)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_messages_forwarded "
+            "ON messages(forwarded_id, topic_id, in_group, received_id)"
+        )
+        cursor.execute("ANALYZE messages")
+        connection.commit()
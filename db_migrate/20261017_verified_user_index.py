@@ -0,0 +1,19 @@
+"""Make verified_users unique per user so verification checks use an index."""
+
+import sqlite3
+
+
+def upgrade(db_path):
+    with sqlite3.connect(db_path) as connection:
+        cursor = connection.cursor()
+        # INSERT OR REPLACE had nothing to conflict with, so repeated
+        # verifications appended rows; keep the earliest row for each user.
+        cursor.execute(
+            "DELETE FROM verified_users WHERE id NOT IN "
+            "(SELECT MIN(id) FROM verified_users GROUP BY user_id)"
+        )
+        cursor.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_verified_user "
+            "ON verified_users(user_id)"
+        )
+        connection.commit()
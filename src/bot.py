@@ -1,7 +1,6 @@
 # pyright: reportUnusedCallResult=false
 """Main bot class for BetterForward Enhance."""
 
-import sqlite3
 from contextlib import closing
 from types import SimpleNamespace
 
@@ -18,13 +17,17 @@ from src.handlers.message_handler import MessageHandler
 from src.utils.auto_response import AutoResponseManager
 from src.utils.blocking import (
     BLOCKED_REPLY_COOLDOWN_SECONDS,
+    cache_blocked_reply_setting,
+    invalidate_blocked_user_ids,
     remaining_block_seconds,
     temporary_block_message,
 )
 from src.utils.captcha import CaptchaManager
+from src.utils.db_helper import open_db
 from src.utils.message_queue import MessageQueueManager
 from src.utils.spam_detector_manager import SpamDetectorManager
 from src.utils.spam_detectors import KeywordSpamDetector
+from src.utils.topic_cache import TopicCache
 from src.utils.webapp_verification import TurnstileWebAppService
 
 
@@ -91,15 +94,18 @@ class TGBot:
         self.spam_detector_manager.register_detector(self.keyword_detector)
 
         # Initialize handlers
+        self.topic_cache = TopicCache()
         self.message_handler = MessageHandler(
             self.bot, self.group_id, db_path, self.cache,
             self.captcha_manager, self.auto_response_manager,
             spam_detector_manager=self.spam_detector_manager,
-            bot_instance=self
+            bot_instance=self,
+            topic_cache=self.topic_cache
         )
         self.command_handler = CommandHandler(
             self.bot, self.group_id, db_path, self.cache,
-            self.time_zone, self.captcha_manager
+            self.time_zone, self.captcha_manager,
+            topic_cache=self.topic_cache
         )
         self.admin_handler = AdminHandler(
             self.bot, self.group_id, db_path, self.cache,
@@ -278,7 +284,7 @@ class TGBot:
 
     def _handle_webapp_verification(self, user_id, purpose, user_data):
         """Apply a verified one-time WebApp challenge to its declared purpose."""
-        with closing(sqlite3.connect(self.db_path)) as db:
+        with closing(open_db(self.db_path, isolation_level="DEFERRED")) as db:
             cursor = db.cursor()
             blocked = cursor.execute(
                 """SELECT block_reason, blocked_until FROM blocked_users
@@ -296,8 +302,7 @@ class TGBot:
                             "remaining_seconds": remaining_block_seconds(blocked_until),
                         }
                     return False, {"code": "account_blocked"}
-                self.captcha_manager.set_user_verified(user_id, db)
-                self.captcha_manager.reset_attempts(user_id, db)
+                self.captcha_manager.complete_verification(user_id, db)
                 self.bot.send_message(
                     user_id, _("Verification successful, you can now send messages"))
                 return True, {"code": "verification_successful"}
@@ -311,7 +316,7 @@ class TGBot:
                     first_name=user_data.get("first_name") or "",
                     last_name=user_data.get("last_name") or "",
                 )
-                self.message_handler._submit_appeal(user_id, user, db, cursor)
+                self.message_handler._submit_appeal(user_id, user)
                 return True, {"code": "appeal_verification_successful"}
 
         return False, {"code": "invalid_verification_purpose"}
@@ -321,6 +326,7 @@ class TGBot:
         settings = self.database.get_all_settings()
         for key, value in settings.items():
             self.cache.set(f"setting_{key}", value)
+        cache_blocked_reply_setting(self.cache)
 
     def update_self_time_zone(self):
         """Update the timezone from cache and propagate to all handlers."""
@@ -535,13 +541,14 @@ class TGBot:
             )
             if cursor.rowcount:
                 logger.info("Removed %s expired rate-limit blocks", cursor.rowcount)
+                invalidate_blocked_user_ids()
         finally:
             db.close()
         self.cache.set(cleanup_key, True, 3600)
 
     def _is_rate_limit_verified(self, user_id: int) -> bool:
         """Use the cached verification state without database work on ingress."""
-        return bool(self.cache.get(f"verified_{user_id}"))
+        return self.captcha_manager.cached_verification(user_id)
 
     def _is_rate_limit_priority(self, user_id: int) -> bool:
         """Return whether an admin-replied user is still inside the activity window."""
@@ -607,7 +614,8 @@ class TGBot:
                     remaining_seconds = remaining_block_seconds(blocked_until)
         finally:
             db.close()
-        self.cache.delete(f"verified_{user.id}")
+        invalidate_blocked_user_ids()
+        self.captcha_manager.forget_verification(user.id)
         self.cache.delete(f"priority_user_{user.id}")
         self.message_queue_manager.revoke_user_priority(user.id)
         if not temporary_block_applied:
@@ -641,5 +649,8 @@ class TGBot:
         logger.info(_("Stopping bot..."))
         self.webapp_service.stop()
         self.message_queue_manager.stop()
+        self.callback_handler.close()
+        self.message_handler.close()
+        self.captcha_manager.close()
         self.bot.stop_bot()
         logger.info(_("Bot stopped"))
@@ -1,6 +1,5 @@
 """Admin functionality handling module."""
 
-import json
 import re
 import sqlite3
 import httpx
@@ -13,7 +12,9 @@ from telebot.apihelper import ApiTelegramException
 from telebot.types import Message
 
 from src.config import logger, _
+from src.utils import callback_payloads as payloads
 from src.utils.blocking import (
+    cache_blocked_reply_setting,
     format_block_duration,
     format_block_expiry,
     remaining_block_seconds,
@@ -67,7 +68,7 @@ class AdminHandler:
 
     def _panel_back_button(self, action: str = "menu"):
         return types.InlineKeyboardButton(
-            "⬅️" + _("Back"), callback_data=json.dumps({"action": action}))
+            "⬅️" + _("Back"), callback_data=payloads.action(action))
 
     def update_time_zone(self):
         """Update the timezone from cache and propagate to auto_response_manager."""
@@ -95,27 +96,27 @@ class AdminHandler:
         markup = types.InlineKeyboardMarkup()
         buttons = [
             types.InlineKeyboardButton("💬" + _("Auto Reply"),
-                                       callback_data=json.dumps({"action": "auto_reply"})),
+                                       callback_data=payloads.action("auto_reply")),
             types.InlineKeyboardButton("📙" + _("Default Message"),
-                                       callback_data=json.dumps({"action": "default_msg"})),
+                                       callback_data=payloads.action("default_msg")),
             types.InlineKeyboardButton("⛔" + _("Banned Users"),
-                                       callback_data=json.dumps({"action": "ban_user"})),
+                                       callback_data=payloads.action("ban_user")),
             types.InlineKeyboardButton("🚫" + _("Spam Keywords"),
-                                       callback_data=json.dumps({"action": "spam_keywords"})),
+                                       callback_data=payloads.action("spam_keywords")),
             types.InlineKeyboardButton("🚷" + _("Blocked User Reply"),
-                                       callback_data=json.dumps({"action": "blocked_reply_settings"})),
+                                       callback_data=payloads.action("blocked_reply_settings")),
             types.InlineKeyboardButton("🔒" + _("Captcha Settings"),
-                                       callback_data=json.dumps({"action": "captcha_settings"})),
+                                       callback_data=payloads.action("captcha_settings")),
             types.InlineKeyboardButton("🛡" + _("Turnstile WebApp"),
-                                       callback_data=json.dumps({"action": "turnstile_settings"})),
+                                       callback_data=payloads.action("turnstile_settings")),
             types.InlineKeyboardButton("📝" + _("Appeal Management"),
-                                       callback_data=json.dumps({"action": "appeal_management"})),
+                                       callback_data=payloads.action("appeal_management")),
             types.InlineKeyboardButton("🌍" + _("Time Zone Settings"),
-                                       callback_data=json.dumps({"action": "time_zone_settings"})),
+                                       callback_data=payloads.action("time_zone_settings")),
             types.InlineKeyboardButton("📢" + _("Broadcast Message"),
-                                       callback_data=json.dumps({"action": "broadcast_message"})),
+                                       callback_data=payloads.action("broadcast_message")),
             types.InlineKeyboardButton("📡" + _("Show Host IP Info"),
-                                       callback_data=json.dumps({"action": "show_host_ip"}))
+                                       callback_data=payloads.action("show_host_ip"))
         ]
 
         for i in range(0, len(buttons), 2):
@@ -190,10 +191,10 @@ class AdminHandler:
         markup = types.InlineKeyboardMarkup()
         markup.add(types.InlineKeyboardButton(
             "➕" + _("Add Auto Reply"),
-            callback_data=json.dumps({"action": "start_add_auto_reply"})))
+            callback_data=payloads.action("start_add_auto_reply")))
         markup.add(types.InlineKeyboardButton(
             "⚙️" + _("Manage Existing Auto Reply"),
-            callback_data=json.dumps({"action": "manage_auto_reply"})))
+            callback_data=payloads.action("manage_auto_reply")))
         markup.add(self._panel_back_button())
         text = _("Auto Reply") if not notice else notice + "\n\n" + _("Auto Reply")
         return self._edit_panel_by_id(chat_id, message_id, text, markup)
@@ -262,10 +263,10 @@ class AdminHandler:
         markup.row(
             types.InlineKeyboardButton(
                 "✅" + _("Yes"),
-                callback_data=json.dumps({"action": "set_auto_response_time", "value": "yes"})),
+                callback_data=payloads.action("set_auto_response_time", value="yes")),
             types.InlineKeyboardButton(
                 "❌" + _("No"),
-                callback_data=json.dumps({"action": "set_auto_response_time", "value": "no"})),
+                callback_data=payloads.action("set_auto_response_time", value="no")),
         )
         self._edit_panel_by_id(
             message.chat.id, panel_message_id,
@@ -363,7 +364,7 @@ class AdminHandler:
 
         markup = types.InlineKeyboardMarkup()
         back_button = types.InlineKeyboardButton("⬅️" + _("Back"),
-                                                 callback_data=json.dumps({"action": "auto_reply"}))
+                                                 callback_data=payloads.action("auto_reply"))
 
         text = _("Auto Reply List:") + "\n"
         text += _("Total: {}").format(result["total"]) + "\n"
@@ -384,7 +385,7 @@ class AdminHandler:
                 text += _("Disabled") + "\n\n"
             id_buttons.append(types.InlineKeyboardButton(
                 text=f"#{auto_response['id']}",
-                callback_data=json.dumps({"action": "select_auto_reply", "id": auto_response['id']})))
+                callback_data=payloads.action("select_auto_reply", id=auto_response['id'])))
 
         if id_buttons:
             markup.row(*id_buttons)
@@ -393,19 +394,15 @@ class AdminHandler:
         if 1 < page < result["total_pages"]:
             markup.row(
                 types.InlineKeyboardButton("⬅️" + _("Previous Page"),
-                                           callback_data=json.dumps({"action": "manage_auto_reply",
-                                                                     "page": page - 1})),
+                                           callback_data=payloads.action("manage_auto_reply", page=page - 1)),
                 types.InlineKeyboardButton("➡️" + _("Next Page"),
-                                           callback_data=json.dumps({"action": "manage_auto_reply",
-                                                                     "page": page + 1})))
+                                           callback_data=payloads.action("manage_auto_reply", page=page + 1)))
         elif page > 1:
             markup.add(types.InlineKeyboardButton("⬅️" + _("Previous Page"),
-                                                  callback_data=json.dumps({"action": "manage_auto_reply",
-                                                                            "page": page - 1})))
+                                                  callback_data=payloads.action("manage_auto_reply", page=page - 1)))
         elif page < result["total_pages"]:
             markup.add(types.InlineKeyboardButton("➡️" + _("Next Page"),
-                                                  callback_data=json.dumps({"action": "manage_auto_reply",
-                                                                            "page": page + 1})))
+                                                  callback_data=payloads.action("manage_auto_reply", page=page + 1)))
 
         markup.add(back_button)
         self.bot.edit_message_text(text, message.chat.id, message.message_id, reply_markup=markup)
@@ -419,10 +416,9 @@ class AdminHandler:
 
         markup = types.InlineKeyboardMarkup()
         markup.add(types.InlineKeyboardButton("❌" + _("Delete"),
-                                              callback_data=json.dumps({"action": "delete_auto_reply",
-                                                                        "id": response_id})))
+                                              callback_data=payloads.action("delete_auto_reply", id=response_id)))
         markup.add(types.InlineKeyboardButton("⬅️" + _("Back"),
-                                              callback_data=json.dumps({"action": "manage_auto_reply"})))
+                                              callback_data=payloads.action("manage_auto_reply")))
 
         text = _("Trigger: {}").format(auto_response["key"]) + "\n"
         text += _("Response: {}").format(
@@ -441,7 +437,7 @@ class AdminHandler:
         self.auto_response_manager.delete_auto_response(response_id)
         markup = types.InlineKeyboardMarkup()
         markup.add(types.InlineKeyboardButton("⬅️" + _("Back"),
-                                              callback_data=json.dumps({"action": "manage_auto_reply"})))
+                                              callback_data=payloads.action("manage_auto_reply")))
         self.bot.edit_message_text(_("Auto reply deleted"), chat_id=message.chat.id,
                                    message_id=message.message_id, reply_markup=markup)
 
@@ -473,7 +469,7 @@ class AdminHandler:
 
             markup = types.InlineKeyboardMarkup()
             back_button = types.InlineKeyboardButton("⬅️" + _("Back"),
-                                                     callback_data=json.dumps({"action": "menu"}))
+                                                     callback_data=payloads.MENU)
 
             text = _("Banned User List:") + "\n"
             text += _("Total: {}").format(total) + "\n"
@@ -499,23 +495,21 @@ class AdminHandler:
 
                     markup.add(types.InlineKeyboardButton(
                         text=f"ID: {user_id}",
-                        callback_data=json.dumps({"action": "select_ban_user", "id": user_id})))
+                        callback_data=payloads.action("select_ban_user", id=user_id)))
 
             # Add pagination buttons
             if 1 < page < total_pages:
                 markup.row(
                     types.InlineKeyboardButton("⬅️" + _("Previous Page"),
-                                               callback_data=json.dumps({"action": "ban_user", "page": page - 1})),
+                                               callback_data=payloads.action("ban_user", page=page - 1)),
                     types.InlineKeyboardButton("➡️" + _("Next Page"),
-                                               callback_data=json.dumps({"action": "ban_user", "page": page + 1})))
+                                               callback_data=payloads.action("ban_user", page=page + 1)))
             elif page > 1:
                 markup.add(types.InlineKeyboardButton("⬅️" + _("Previous Page"),
-                                                      callback_data=json.dumps(
-                                                          {"action": "ban_user", "page": page - 1})))
+                                                      callback_data=payloads.action("ban_user", page=page - 1)))
             elif page < total_pages:
                 markup.add(types.InlineKeyboardButton("➡️" + _("Next Page"),
-                                                      callback_data=json.dumps(
-                                                          {"action": "ban_user", "page": page + 1})))
+                                                      callback_data=payloads.action("ban_user", page=page + 1)))
 
             markup.add(back_button)
             self.bot.send_message(text=text,
@@ -539,7 +533,7 @@ class AdminHandler:
             if user_info is None:
                 markup = types.InlineKeyboardMarkup()
                 markup.add(types.InlineKeyboardButton("⬅️" + _("Back"),
-                                                      callback_data=json.dumps({"action": "ban_user"})))
+                                                      callback_data=payloads.action("ban_user")))
                 self.bot.edit_message_text(_("User not found"), message.chat.id, message.message_id,
                                            reply_markup=markup)
                 return
@@ -548,10 +542,9 @@ class AdminHandler:
 
         markup = types.InlineKeyboardMarkup()
         markup.add(types.InlineKeyboardButton("❌" + _("Unban"),
-                                              callback_data=json.dumps({"action": "unban_user",
-                                                                        "id": user_id})))
+                                              callback_data=payloads.action("unban_user", id=user_id)))
         markup.add(types.InlineKeyboardButton("⬅️" + _("Back"),
-                                              callback_data=json.dumps({"action": "ban_user"})))
+                                              callback_data=payloads.action("ban_user")))
 
         # Build user info text
         text = _("Blocked User Details") + "\n\n"
@@ -572,10 +565,10 @@ class AdminHandler:
         markup = types.InlineKeyboardMarkup()
         markup.add(types.InlineKeyboardButton(
             "✏️" + _("Edit Message"),
-            callback_data=json.dumps({"action": "edit_default_msg"})))
+            callback_data=payloads.action("edit_default_msg")))
         markup.add(types.InlineKeyboardButton(
             "🔄️" + _("Set to Default"),
-            callback_data=json.dumps({"action": "empty_default_msg"})))
+            callback_data=payloads.action("empty_default_msg")))
         markup.add(self._panel_back_button())
         text = _("Default Message") + "\n" + _(
             "The default message is an auto-reply to the commands /help and /start")
@@ -642,10 +635,10 @@ class AdminHandler:
             icon = "✅" + _("(Selected) ") if current == value else "⚪"
             markup.add(types.InlineKeyboardButton(
                 icon + label,
-                callback_data=json.dumps({"action": "set_captcha", "value": value})))
+                callback_data=payloads.action("set_captcha", value=value)))
         markup.add(types.InlineKeyboardButton(
             _("Configure Turnstile WebApp"),
-            callback_data=json.dumps({"action": "turnstile_settings"})))
+            callback_data=payloads.action("turnstile_settings")))
         markup.add(self._panel_back_button())
         text = _("Captcha Settings")
         if notice:
@@ -669,10 +662,7 @@ class AdminHandler:
         markup = types.InlineKeyboardMarkup()
         markup.add(types.InlineKeyboardButton(
             _("Disable") if running else _("Enable"),
-            callback_data=json.dumps({
-                "action": "set_turnstile_enabled",
-                "value": "disable" if running else "enable",
-            })))
+            callback_data=payloads.action("set_turnstile_enabled", value="disable" if running else "enable")))
         labels = {
             "public_url": _("Public URL"),
             "site_key": _("Site Key"),
@@ -685,9 +675,7 @@ class AdminHandler:
         for field, label in labels.items():
             markup.add(types.InlineKeyboardButton(
                 "✏️ " + label,
-                callback_data=json.dumps({
-                    "action": "edit_turnstile_setting", "field": field,
-                })))
+                callback_data=payloads.action("edit_turnstile_setting", field=field)))
         markup.add(self._panel_back_button())
         return markup
 
@@ -798,9 +786,9 @@ class AdminHandler:
                  ("America/New_York", "New York"))
         for value, label in zones:
             markup.add(types.InlineKeyboardButton(
-                label, callback_data=json.dumps({"action": "set_time_zone", "value": value})))
+                label, callback_data=payloads.action("set_time_zone", value=value)))
         markup.add(types.InlineKeyboardButton(
-            _("Custom time zone"), callback_data=json.dumps({"action": "edit_time_zone"})))
+            _("Custom time zone"), callback_data=payloads.action("edit_time_zone")))
         markup.add(self._panel_back_button())
         return markup
 
@@ -941,9 +929,9 @@ class AdminHandler:
         markup = types.InlineKeyboardMarkup()
         markup.row(
             types.InlineKeyboardButton(
-                "✅" + _("Confirm"), callback_data=json.dumps({"action": "confirm_broadcast"})),
+                "✅" + _("Confirm"), callback_data=payloads.action("confirm_broadcast")),
             types.InlineKeyboardButton(
-                "❌" + _("Cancel"), callback_data=json.dumps({"action": "cancel_broadcast"})),
+                "❌" + _("Cancel"), callback_data=payloads.action("cancel_broadcast")),
         )
         if content_type == "text":
             preview = self.bot.send_message(self.group_id, content, reply_markup=markup)
@@ -1024,13 +1012,13 @@ class AdminHandler:
         markup = types.InlineKeyboardMarkup()
         markup.add(types.InlineKeyboardButton(
             "➕" + _("Add Keyword"),
-            callback_data=json.dumps({"action": "add_spam_keyword"})))
+            callback_data=payloads.action("add_spam_keyword")))
         markup.add(types.InlineKeyboardButton(
             "📋" + _("View Keywords"),
-            callback_data=json.dumps({"action": "view_spam_keywords"})))
+            callback_data=payloads.action("view_spam_keywords")))
         markup.add(types.InlineKeyboardButton(
             "🔄" + _("Reset Spam Topic"),
-            callback_data=json.dumps({"action": "reset_spam_topic"})))
+            callback_data=payloads.action("reset_spam_topic")))
         markup.add(self._panel_back_button())
 
         keyword_count = self.spam_keyword_manager.get_keyword_count()
@@ -1121,7 +1109,7 @@ class AdminHandler:
 
         markup = types.InlineKeyboardMarkup()
         back_button = types.InlineKeyboardButton("⬅️" + _("Back"),
-                                                 callback_data=json.dumps({"action": "spam_keywords"}))
+                                                 callback_data=payloads.action("spam_keywords"))
 
         text = _("Spam Keywords List:") + "\n"
         text += _("Total: {}").format(total) + "\n"
@@ -1136,7 +1124,7 @@ class AdminHandler:
                 # Use index instead of keyword to avoid callback_data size limit
                 keyword_buttons.append(types.InlineKeyboardButton(
                     text=f"#{idx + 1}",
-                    callback_data=json.dumps({"action": "select_spam_keyword", "idx": idx})))
+                    callback_data=payloads.action("select_spam_keyword", idx=idx)))
 
             # Add keyword selection buttons (max 5 per row)
             for i in range(0, len(keyword_buttons), 5):
@@ -1146,19 +1134,15 @@ class AdminHandler:
         if 1 < page < total_pages:
             markup.row(
                 types.InlineKeyboardButton("⬅️" + _("Previous Page"),
-                                           callback_data=json.dumps({"action": "view_spam_keywords",
-                                                                     "page": page - 1})),
+                                           callback_data=payloads.action("view_spam_keywords", page=page - 1)),
                 types.InlineKeyboardButton("➡️" + _("Next Page"),
-                                           callback_data=json.dumps({"action": "view_spam_keywords",
-                                                                     "page": page + 1})))
+                                           callback_data=payloads.action("view_spam_keywords", page=page + 1)))
         elif page > 1:
             markup.add(types.InlineKeyboardButton("⬅️" + _("Previous Page"),
-                                                  callback_data=json.dumps({"action": "view_spam_keywords",
-                                                                            "page": page - 1})))
+                                                  callback_data=payloads.action("view_spam_keywords", page=page - 1)))
         elif page < total_pages:
             markup.add(types.InlineKeyboardButton("➡️" + _("Next Page"),
-                                                  callback_data=json.dumps({"action": "view_spam_keywords",
-                                                                            "page": page + 1})))
+                                                  callback_data=payloads.action("view_spam_keywords", page=page + 1)))
 
         markup.add(back_button)
         self.bot.edit_message_text(text, message.chat.id, message.message_id, reply_markup=markup)
@@ -1170,7 +1154,7 @@ class AdminHandler:
         if keywords is None or idx >= len(keywords):
             markup = types.InlineKeyboardMarkup()
             markup.add(types.InlineKeyboardButton("⬅️" + _("Back"),
-                                                  callback_data=json.dumps({"action": "view_spam_keywords"})))
+                                                  callback_data=payloads.action("view_spam_keywords")))
             self.bot.edit_message_text(_("Keyword not found or expired"),
                                        message.chat.id, message.message_id,
                                        reply_markup=markup)
@@ -1180,10 +1164,9 @@ class AdminHandler:
 
         markup = types.InlineKeyboardMarkup()
         markup.add(types.InlineKeyboardButton("❌" + _("Delete"),
-                                              callback_data=json.dumps({"action": "delete_spam_keyword",
-                                                                        "idx": idx})))
+                                              callback_data=payloads.action("delete_spam_keyword", idx=idx)))
         markup.add(types.InlineKeyboardButton("⬅️" + _("Back"),
-                                              callback_data=json.dumps({"action": "view_spam_keywords"})))
+                                              callback_data=payloads.action("view_spam_keywords")))
 
         text = _("Keyword: {}").format(keyword) + "\n"
         text += _("Select an action:")
@@ -1197,7 +1180,7 @@ class AdminHandler:
         if keywords is None or idx >= len(keywords):
             markup = types.InlineKeyboardMarkup()
             markup.add(types.InlineKeyboardButton("⬅️" + _("Back"),
-                                                  callback_data=json.dumps({"action": "view_spam_keywords"})))
+                                                  callback_data=payloads.action("view_spam_keywords")))
             self.bot.edit_message_text(_("Keyword not found or expired"),
                                        message.chat.id, message.message_id,
                                        reply_markup=markup)
@@ -1208,7 +1191,7 @@ class AdminHandler:
         if self.spam_keyword_manager.remove_keyword(keyword):
             markup = types.InlineKeyboardMarkup()
             markup.add(types.InlineKeyboardButton("⬅️" + _("Back"),
-                                                  callback_data=json.dumps({"action": "view_spam_keywords"})))
+                                                  callback_data=payloads.action("view_spam_keywords")))
             self.bot.edit_message_text(_("Keyword deleted: {}").format(keyword),
                                        chat_id=message.chat.id,
                                        message_id=message.message_id,
@@ -1216,7 +1199,7 @@ class AdminHandler:
         else:
             markup = types.InlineKeyboardMarkup()
             markup.add(types.InlineKeyboardButton("⬅️" + _("Back"),
-                                                  callback_data=json.dumps({"action": "view_spam_keywords"})))
+                                                  callback_data=payloads.action("view_spam_keywords")))
             self.bot.edit_message_text(_("Failed to delete keyword"),
                                        chat_id=message.chat.id,
                                        message_id=message.message_id,
@@ -1230,17 +1213,17 @@ class AdminHandler:
         if current_enabled == "enable":
             markup.add(types.InlineKeyboardButton(
                 "🔕 " + _("Disable Auto Reply"),
-                callback_data=json.dumps({"action": "set_blocked_reply_enabled", "value": "disable"})))
+                callback_data=payloads.action("set_blocked_reply_enabled", value="disable")))
         else:
             markup.add(types.InlineKeyboardButton(
                 "🔔 " + _("Enable Auto Reply"),
-                callback_data=json.dumps({"action": "set_blocked_reply_enabled", "value": "enable"})))
+                callback_data=payloads.action("set_blocked_reply_enabled", value="enable")))
         markup.add(types.InlineKeyboardButton(
             "✏️ " + _("Edit Reply Message"),
-            callback_data=json.dumps({"action": "edit_blocked_reply_message"})))
+            callback_data=payloads.action("edit_blocked_reply_message")))
         markup.add(types.InlineKeyboardButton(
             "🗑️ " + _("Clear Reply Message"),
-            callback_data=json.dumps({"action": "clear_blocked_reply_message"})))
+            callback_data=payloads.action("clear_blocked_reply_message")))
         markup.add(self._panel_back_button())
 
         text = _("Blocked User Auto Reply Settings") + "\n\n"
@@ -1264,6 +1247,7 @@ class AdminHandler:
             return
         self.database.set_setting("blocked_user_reply_enabled", value)
         self.cache.set("setting_blocked_user_reply_enabled", value)
+        cache_blocked_reply_setting(self.cache)
         status = _("Enabled") if value == "enable" else _("Disabled")
         self._render_blocked_reply_panel(
             message.chat.id, message.message_id,
@@ -1303,6 +1287,7 @@ class AdminHandler:
         reply_message = text.strip() or None
         self.database.set_setting("blocked_user_reply_message", reply_message)
         self.cache.set("setting_blocked_user_reply_message", reply_message)
+        cache_blocked_reply_setting(self.cache)
         notice = (_("Blocked user reply message updated: {}").format(reply_message)
                   if reply_message else
                   _("Blocked user reply message cleared. No auto-reply will be sent."))
@@ -1312,6 +1297,7 @@ class AdminHandler:
         """Clear the blocked-user reply and retain its settings panel."""
         self.database.set_setting("blocked_user_reply_message", None)
         self.cache.set("setting_blocked_user_reply_message", None)
+        cache_blocked_reply_setting(self.cache)
         self._render_blocked_reply_panel(
             message.chat.id, message.message_id, _("Blocked user reply message cleared."))
 
@@ -1326,11 +1312,11 @@ class AdminHandler:
         markup = types.InlineKeyboardMarkup()
         markup.add(types.InlineKeyboardButton(
             "✅" + _("Confirm Reset"),
-            callback_data=json.dumps({"action": "confirm_reset_spam_topic"})
+            callback_data=payloads.action("confirm_reset_spam_topic")
         ))
         markup.add(types.InlineKeyboardButton(
             "❌" + _("Cancel"),
-            callback_data=json.dumps({"action": "spam_keywords"})
+            callback_data=payloads.action("spam_keywords")
         ))
 
         self.bot.edit_message_text(
@@ -1354,7 +1340,7 @@ class AdminHandler:
                 spam_topic_id = self.cache.get("spam_topic_id")
                 markup = types.InlineKeyboardMarkup()
                 markup.add(types.InlineKeyboardButton("⬅️" + _("Back"),
-                                                      callback_data=json.dumps({"action": "spam_keywords"})))
+                                                      callback_data=payloads.action("spam_keywords")))
                 self.bot.edit_message_text(
                     _("Spam topic reset successfully.\nNew Topic ID: {}").format(spam_topic_id),
                     message.chat.id, message.message_id,
@@ -1362,7 +1348,7 @@ class AdminHandler:
             else:
                 markup = types.InlineKeyboardMarkup()
                 markup.add(types.InlineKeyboardButton("⬅️" + _("Back"),
-                                                      callback_data=json.dumps({"action": "spam_keywords"})))
+                                                      callback_data=payloads.action("spam_keywords")))
                 self.bot.edit_message_text(_("Failed to reset spam topic"),
                                            message.chat.id, message.message_id,
                                            reply_markup=markup)
@@ -1370,7 +1356,7 @@ class AdminHandler:
             logger.error(f"Error resetting spam topic: {e}")
             markup = types.InlineKeyboardMarkup()
             markup.add(types.InlineKeyboardButton("⬅️" + _("Back"),
-                                                  callback_data=json.dumps({"action": "spam_keywords"})))
+                                                  callback_data=payloads.action("spam_keywords")))
             self.bot.edit_message_text(_("Failed to reset spam topic: {}").format(str(e)),
                                        message.chat.id, message.message_id,
                                        reply_markup=markup)
@@ -1394,19 +1380,19 @@ class AdminHandler:
 
         markup.add(types.InlineKeyboardButton(
             _("📋 View Pending Appeals ({})").format(pending_count),
-            callback_data=json.dumps({"action": "view_pending_appeals"})
+            callback_data=payloads.action("view_pending_appeals")
         ))
         markup.add(types.InlineKeyboardButton(
             _("📊 View All Appeals"),
-            callback_data=json.dumps({"action": "view_all_appeals"})
+            callback_data=payloads.action("view_all_appeals")
         ))
         markup.add(types.InlineKeyboardButton(
             _("Current Mode: {}").format(mode_text),
-            callback_data=json.dumps({"action": "toggle_appeal_mode"})
+            callback_data=payloads.action("toggle_appeal_mode")
         ))
         markup.add(types.InlineKeyboardButton(
             "⬅️" + _("Back"),
-            callback_data=json.dumps({"action": "menu"})
+            callback_data=payloads.MENU
         ))
 
         help_text = _(
@@ -1440,7 +1426,7 @@ class AdminHandler:
             markup = types.InlineKeyboardMarkup()
             markup.add(types.InlineKeyboardButton(
                 "⬅️" + _("Back"),
-                callback_data=json.dumps({"action": "appeal_management"})
+                callback_data=payloads.action("appeal_management")
             ))
             self.bot.edit_message_text(
                 _("✅ No pending appeals"),
@@ -1461,7 +1447,7 @@ class AdminHandler:
         markup = types.InlineKeyboardMarkup()
         markup.add(types.InlineKeyboardButton(
             "⬅️" + _("Back"),
-            callback_data=json.dumps({"action": "appeal_management"})
+            callback_data=payloads.action("appeal_management")
         ))
 
         self.bot.edit_message_text(text, message.chat.id, message.message_id, reply_markup=markup)
@@ -1506,7 +1492,7 @@ class AdminHandler:
         markup = types.InlineKeyboardMarkup()
         markup.add(types.InlineKeyboardButton(
             "⬅️" + _("Back"),
-            callback_data=json.dumps({"action": "appeal_management"})
+            callback_data=payloads.action("appeal_management")
         ))
 
         self.bot.edit_message_text(text, message.chat.id, message.message_id, reply_markup=markup)
@@ -1525,7 +1511,7 @@ class AdminHandler:
         markup = types.InlineKeyboardMarkup()
         markup.add(types.InlineKeyboardButton(
             "⬅️" + _("Back"),
-            callback_data=json.dumps({"action": "appeal_management"})
+            callback_data=payloads.action("appeal_management")
         ))
 
         self.bot.edit_message_text(
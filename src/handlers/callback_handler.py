@@ -1,10 +1,57 @@
 """Callback query handling module."""
 
 import json
+import time
 
 from telebot import types
 
 from src.config import logger, _
+from src.utils import callback_payloads as payloads
+from src.utils.blocking import invalidate_blocked_user_ids
+from src.utils.db_helper import ConnectionPool
+
+try:
+    import orjson  # pyright: ignore[reportMissingImports]
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# Callback data is at most 64 bytes; orjson parses it several times faster than
+# the stdlib, and a bound decoder avoids json.loads' per-call argument handling.
+_decode_callback = orjson.loads if orjson else json.JSONDecoder().decode
+
+# Chat-based appeal challenges, mapped to whether the generated challenge text
+# is appended to the banner (image captchas are sent as a separate photo).
+_APPEAL_INLINE_ANSWER = {"math": True, "image": False}
+
+# Fields an admin action must carry, checked once before dispatch. ID-like
+# fields are coerced to int so handlers can use them directly.
+_REQUIRED_FIELDS = {
+    "select_auto_reply": ("id",),
+    "delete_auto_reply": ("id",),
+    "unban_user": ("id",),
+    "select_ban_user": ("id",),
+    "delete_banned_thread": ("thread_id",),
+    "select_spam_keyword": ("idx",),
+    "delete_spam_keyword": ("idx",),
+    "set_blocked_reply_enabled": ("value",),
+    "approve_appeal": ("user_id",),
+    "reject_appeal": ("user_id",),
+}
+_INT_FIELDS = frozenset({"id", "user_id", "idx", "thread_id"})
+
+# Seconds the captcha setting is reused before re-reading the shared cache
+CAPTCHA_SETTING_TTL = 30
+
+# SQL statements
+SQL_SELECT_APPEAL_STATUS = "SELECT status FROM appeal_requests WHERE user_id = ?"
+SQL_SELECT_ACTIVE_BLOCK = """SELECT block_reason FROM blocked_users
+    WHERE user_id = ?
+      AND (blocked_until IS NULL OR blocked_until > CURRENT_TIMESTAMP)"""
+SQL_UPDATE_APPEAL_STATUS = """UPDATE appeal_requests
+    SET status = ?, admin_id = ?, handled_at = CURRENT_TIMESTAMP
+    WHERE user_id = ?"""
+SQL_DELETE_BLOCKED_USER = "DELETE FROM blocked_users WHERE user_id = ?"
+SQL_DELETE_VERIFICATION_ATTEMPTS = "DELETE FROM verification_attempts WHERE user_id = ?"
 
 
 class CallbackHandler:
@@ -19,19 +66,64 @@ class CallbackHandler:
         self.captcha_manager = captcha_manager
         self.spam_detector = spam_detector
         self.db_path = db_path
+        self._captcha_setting = None
+        self._captcha_setting_expires = 0.0
+        self._pool = ConnectionPool(db_path, size=4)
+        self._admin_dispatch = self._build_admin_dispatch()
+        # Translated appeal texts, looked up once instead of on every callback
+        self._msg_appeal_status = {
+            "pending": _("Your appeal is already pending review"),
+            "approved": _("Your appeal was already approved"),
+            "rejected": _("Your appeal was already rejected. No further appeals allowed."),
+        }
+        self._msg_appeal_started = _("Appeal verification started. Complete the challenge below.")
+        self._msg_appeal_approved_user = _(
+            "✅ Good news! Your appeal has been approved by an administrator.\n\n"
+            "You can now send messages again. Please complete the verification process.")
+        self._msg_appeal_approved_admin = _(
+            "✅ Appeal Approved\n\n"
+            "User ID: {}\n"
+            "Approved by: {} (ID: {})\n"
+            "Action: User unblocked and verification attempts reset")
+        self._msg_appeal_rejected_user = _(
+            "❌ Your appeal has been reviewed and rejected by an administrator.\n\n"
+            "The block remains in effect. No further appeals are allowed.")
+        self._msg_appeal_rejected_admin = _(
+            "❌ Appeal Rejected\n\n"
+            "User ID: {}\n"
+            "Rejected by: {} (ID: {})\n"
+            "Action: User remains blocked")
+        # Exact payloads of the field-less admin buttons, so the most common
+        # presses resolve their action without decoding JSON.
+        self._fixed_actions = {}
+        for action in self._admin_dispatch:
+            payload = {"action": action}
+            self._fixed_actions[json.dumps(payload)] = action
+            self._fixed_actions[json.dumps(payload, separators=(",", ":"))] = action
+
+    def close(self):
+        """Release pooled database connections."""
+        self._pool.close()
 
     def handle_callback_query(self, call: types.CallbackQuery):
         """Main callback query handler."""
-        if call.data == "null":
-            logger.error(_("Invalid callback data received"))
-            return
-
-        try:
-            data = json.loads(call.data)
-            action = data["action"]
-        except json.JSONDecodeError:
-            logger.error(_("Invalid JSON data received"))
-            return
+        raw = call.data
+        action = self._fixed_actions.get(raw)
+        if action is not None:
+            data = {"action": action}
+        else:
+            # "null" marks no-op buttons such as page counters.
+            if raw == "null":
+                return
+            if not raw or raw[0] != "{":
+                logger.error(_("Invalid callback data received"))
+                return
+            try:
+                data = _decode_callback(raw)
+                action = data["action"]
+            except ValueError:
+                logger.error(_("Invalid JSON data received"))
+                return
 
         # User end callbacks answer themselves so they can provide a meaningful status.
         if action == "verify_button":
@@ -72,49 +164,30 @@ class CallbackHandler:
             self.bot.answer_callback_query(call.id, _("Invalid user ID"), show_alert=True)
             return
 
-        import sqlite3
-
         try:
-            with sqlite3.connect(self.db_path) as db:
+            # Only read under the pooled connection; reply to Telegram after it
+            # has been handed back so other callbacks are not kept waiting.
+            with self._pool.acquire() as db:
                 cursor = db.cursor()
-                existing_appeal = cursor.execute(
-                    "SELECT status FROM appeal_requests WHERE user_id = ?",
-                    (user_id,)
-                ).fetchone()
-                if existing_appeal:
-                    status = existing_appeal[0]
-                    if status == "pending":
-                        self.bot.answer_callback_query(
-                            call.id, _("Your appeal is already pending review"), show_alert=True)
-                        return
-                    if status == "approved":
-                        self.bot.answer_callback_query(
-                            call.id, _("Your appeal was already approved"), show_alert=True)
-                        return
-                    if status == "rejected":
-                        self.bot.answer_callback_query(
-                            call.id,
-                            _("Your appeal was already rejected. No further appeals allowed."),
-                            show_alert=True,
-                        )
-                        return
-
-                is_blocked = cursor.execute(
-                    """SELECT block_reason FROM blocked_users
-                       WHERE user_id = ?
-                         AND (blocked_until IS NULL OR blocked_until > CURRENT_TIMESTAMP)""",
-                    (user_id,)
-                ).fetchone()
-                if not is_blocked:
-                    self.bot.answer_callback_query(call.id, _("You are not blocked"), show_alert=True)
-                    return
+                existing_appeal = cursor.execute(SQL_SELECT_APPEAL_STATUS, (user_id,)).fetchone()
+                status = existing_appeal[0] if existing_appeal else None
+                is_blocked = None
+                if status not in self._msg_appeal_status:
+                    is_blocked = cursor.execute(SQL_SELECT_ACTIVE_BLOCK, (user_id,)).fetchone()
+
+            if status in self._msg_appeal_status:
+                self.bot.answer_callback_query(call.id, self._msg_appeal_status[status], show_alert=True)
+                return
+            if not is_blocked:
+                self.bot.answer_callback_query(call.id, _("You are not blocked"), show_alert=True)
+                return
 
             self.admin_handler.cache.set(f"appeal_verification_{user_id}", True, 300)
             service = self.captcha_manager.webapp_service
-            captcha_type = self.admin_handler.cache.get("setting_captcha")
+            captcha_type = self._get_captcha_setting()
             if captcha_type == "webapp" and (not service or not service.is_enabled()):
                 captcha_type = "image"
-            if captcha_type not in {"webapp", "math", "image"}:
+            if captcha_type != "webapp" and captcha_type not in _APPEAL_INLINE_ANSWER:
                 captcha_type = "webapp" if service and service.is_enabled() else "math"
 
             if captcha_type == "webapp":
@@ -122,26 +195,20 @@ class CallbackHandler:
                 markup = types.InlineKeyboardMarkup()
                 markup.add(types.InlineKeyboardButton(
                     _("Verify"), web_app=types.WebAppInfo(url=challenge_url)))
-                challenge_text = _(
-                    "Appeal verification started. Complete the challenge below.")
+                challenge_text = self._msg_appeal_started
                 self.bot.edit_message_text(
                     challenge_text,
                     call.message.chat.id,
                     call.message.message_id,
                     reply_markup=markup,
                 )
-            elif captcha_type == "math":
-                captcha = self.captcha_manager.generate_captcha(user_id, "math")
-                self.bot.edit_message_text(
-                    _("Appeal verification started. Complete the challenge below.") + "\n\n" + captcha,
-                    call.message.chat.id,
-                    call.message.message_id,
-                    reply_markup=None,
-                )
             else:
-                self.captcha_manager.generate_captcha(user_id, "image")
+                captcha = self.captcha_manager.generate_captcha(user_id, captcha_type)
+                challenge_text = self._msg_appeal_started
+                if _APPEAL_INLINE_ANSWER[captcha_type]:
+                    challenge_text += "\n\n" + captcha
                 self.bot.edit_message_text(
-                    _("Appeal verification started. Complete the challenge below."),
+                    challenge_text,
                     call.message.chat.id,
                     call.message.message_id,
                     reply_markup=None,
@@ -164,242 +231,183 @@ class CallbackHandler:
             except Exception:
                 logger.exception("Could not show appeal verification failure to user %s", user_id)
 
+    def _get_captcha_setting(self):
+        """Return the configured captcha type, re-reading the cache at most every TTL."""
+        now = time.monotonic()
+        if now >= self._captcha_setting_expires:
+            self._captcha_setting = self.admin_handler.cache.get("setting_captcha")
+            self._captcha_setting_expires = now + CAPTCHA_SETTING_TTL
+        return self._captcha_setting
+
+    def _invalidate_captcha_setting(self):
+        self._captcha_setting_expires = 0.0
+
+    def _build_admin_dispatch(self) -> dict:
+        """Map admin callback actions to handlers taking ``(call, data)``."""
+        return {
+            "menu": lambda call, data: self.admin_handler.menu(call.message, edit=True),
+            "auto_reply": lambda call, data: self.admin_handler.auto_reply_menu(call.message),
+            "set_auto_response_time":
+                lambda call, data: self.admin_handler.handle_auto_response_time_callback(call.message, data),
+            "start_add_auto_reply": lambda call, data: self.admin_handler.add_auto_response(call.message),
+            "add_auto_reply": lambda call, data: self.admin_handler._finish_auto_response(
+                call.message.chat.id, call.message.message_id),
+            "manage_auto_reply":
+                lambda call, data: self.admin_handler.manage_auto_reply(call.message, page=data.get("page", 1)),
+            "select_auto_reply": lambda call, data: self.admin_handler.select_auto_reply(call.message, data["id"]),
+            "delete_auto_reply": lambda call, data: self.admin_handler.delete_auto_reply(call.message, data["id"]),
+            "ban_user":
+                lambda call, data: self.admin_handler.manage_ban_user(call.message, page=data.get("page", 1)),
+            "unban_user": lambda call, data: self.command_handler.unban_user(call.message, user_id=data["id"]),
+            "select_ban_user": lambda call, data: self.admin_handler.select_ban_user(call.message, data["id"]),
+            "default_msg": lambda call, data: self.admin_handler.default_msg_menu(call.message),
+            "edit_default_msg": lambda call, data: self.admin_handler.edit_default_msg(call.message),
+            "empty_default_msg": lambda call, data: self.admin_handler.empty_default_msg(call.message),
+            "captcha_settings": lambda call, data: self.admin_handler.captcha_settings_menu(call.message),
+            "set_captcha": self._do_set_captcha,
+            "turnstile_settings": lambda call, data: self.admin_handler.turnstile_settings_menu(call.message),
+            "set_turnstile_enabled": self._do_set_turnstile_enabled,
+            "edit_turnstile_setting":
+                lambda call, data: self.admin_handler.edit_turnstile_setting(call.message, data.get("field")),
+            "broadcast_message": lambda call, data: self.admin_handler.broadcast_message(call.message),
+            "confirm_broadcast": lambda call, data: self.admin_handler.confirm_broadcast_message(call.message),
+            "cancel_broadcast": lambda call, data: self.admin_handler.cancel_broadcast(call.message),
+            "time_zone_settings": lambda call, data: self.admin_handler.time_zone_settings_menu(call.message),
+            "set_time_zone":
+                lambda call, data: self.admin_handler.set_time_zone(call.message, data.get("value", "")),
+            "edit_time_zone": lambda call, data: self.admin_handler.edit_time_zone(call.message),
+            "set_verification": lambda call, data: self.command_handler.set_verification_status(
+                call.message, data.get("value", "")),
+            "confirm_terminate": self._do_confirm_terminate,
+            "cancel_terminate": lambda call, data: self.bot.edit_message_text(
+                _("Operation cancelled"), call.message.chat.id, call.message.message_id),
+            "delete_banned_thread": self._do_delete_banned_thread,
+            "spam_keywords": lambda call, data: self.admin_handler.spam_keywords_menu(call.message),
+            "add_spam_keyword": lambda call, data: self.admin_handler.add_spam_keyword(call.message),
+            "view_spam_keywords":
+                lambda call, data: self.admin_handler.view_spam_keywords(call.message, page=data.get("page", 1)),
+            "select_spam_keyword":
+                lambda call, data: self.admin_handler.select_spam_keyword(call.message, data["idx"]),
+            "delete_spam_keyword":
+                lambda call, data: self.admin_handler.delete_spam_keyword(call.message, data["idx"]),
+            "blocked_reply_settings":
+                lambda call, data: self.admin_handler.blocked_reply_settings_menu(call.message),
+            "set_blocked_reply_enabled":
+                lambda call, data: self.admin_handler.set_blocked_reply_enabled(call.message, data["value"]),
+            "edit_blocked_reply_message":
+                lambda call, data: self.admin_handler.edit_blocked_reply_message(call.message),
+            "clear_blocked_reply_message":
+                lambda call, data: self.admin_handler.clear_blocked_reply_message(call.message),
+            "reset_spam_topic": lambda call, data: self.admin_handler.reset_spam_topic(call.message),
+            "confirm_reset_spam_topic":
+                lambda call, data: self.admin_handler.confirm_reset_spam_topic(call.message),
+            "show_host_ip": lambda call, data: self.admin_handler.show_host_ip(call.message),
+            "approve_appeal": lambda call, data: self._handle_approve_appeal(call, data["user_id"]),
+            "reject_appeal": lambda call, data: self._handle_reject_appeal(call, data["user_id"]),
+            "appeal_management": lambda call, data: self.admin_handler.appeal_management_menu(call.message),
+            "view_pending_appeals": lambda call, data: self.admin_handler.view_pending_appeals(call.message),
+            "view_all_appeals": lambda call, data: self.admin_handler.view_all_appeals(call.message),
+            "toggle_appeal_mode": lambda call, data: self.admin_handler.toggle_appeal_mode(call.message),
+        }
+
     def _handle_admin_callback(self, call: types.CallbackQuery, action: str, data: dict):
         """Handle admin callbacks."""
-        markup = types.InlineKeyboardMarkup()
-        back_button = types.InlineKeyboardButton("⬅️" + _("Back"),
-                                                 callback_data=json.dumps({"action": "menu"}))
-
-        match action:
-            case "menu":
-                self.admin_handler.menu(call.message, edit=True)
-            case "auto_reply":
-                self.admin_handler.auto_reply_menu(call.message)
-            case "set_auto_response_time":
-                self.admin_handler.handle_auto_response_time_callback(call.message, data)
-            case "start_add_auto_reply":
-                self.admin_handler.add_auto_response(call.message)
-            case "add_auto_reply":
-                self.admin_handler._finish_auto_response(
-                    call.message.chat.id, call.message.message_id)
-            case "manage_auto_reply":
-                self.admin_handler.manage_auto_reply(call.message, page=data.get("page", 1))
-            case "select_auto_reply":
-                if "id" not in data:
-                    self.bot.delete_message(self.group_id, call.message.message_id)
-                    self.bot.send_message(self.group_id, _("Invalid action"), reply_markup=markup)
-                    return
-                self.admin_handler.select_auto_reply(call.message, data["id"])
-            case "delete_auto_reply":
-                if "id" not in data:
-                    self.bot.delete_message(self.group_id, call.message.message_id)
-                    self.bot.send_message(self.group_id, _("Invalid action"), reply_markup=markup)
-                    return
-                self.admin_handler.delete_auto_reply(call.message, data["id"])
-            case "ban_user":
-                self.admin_handler.manage_ban_user(call.message, page=data.get("page", 1))
-            case "unban_user":
-                if "id" not in data:
-                    self.bot.delete_message(self.group_id, call.message.message_id)
-                    self.bot.send_message(self.group_id, _("Invalid action"), reply_markup=markup)
-                    return
-                self.command_handler.unban_user(call.message, user_id=data["id"])
-            case "select_ban_user":
-                if "id" not in data:
-                    self.bot.delete_message(self.group_id, call.message.message_id)
-                    self.bot.send_message(self.group_id, _("Invalid action"), reply_markup=markup)
-                    return
-                self.admin_handler.select_ban_user(call.message, data["id"])
-            case "default_msg":
-                self.admin_handler.default_msg_menu(call.message)
-            case "edit_default_msg":
-                self.admin_handler.edit_default_msg(call.message)
-            case "empty_default_msg":
-                self.admin_handler.empty_default_msg(call.message)
-            case "captcha_settings":
-                self.admin_handler.captcha_settings_menu(call.message)
-            case "set_captcha":
-                self.admin_handler.set_captcha(call.message, data["value"])
-            case "turnstile_settings":
-                self.admin_handler.turnstile_settings_menu(call.message)
-            case "set_turnstile_enabled":
-                self.admin_handler.set_turnstile_enabled(call.message, data.get("value"))
-            case "edit_turnstile_setting":
-                self.admin_handler.edit_turnstile_setting(call.message, data.get("field"))
-            case "broadcast_message":
-                self.admin_handler.broadcast_message(call.message)
-            case "confirm_broadcast":
-                self.admin_handler.confirm_broadcast_message(call.message)
-            case "cancel_broadcast":
-                self.admin_handler.cancel_broadcast(call.message)
-            case "time_zone_settings":
-                self.admin_handler.time_zone_settings_menu(call.message)
-            case "set_time_zone":
-                self.admin_handler.set_time_zone(call.message, data.get("value", ""))
-            case "edit_time_zone":
-                self.admin_handler.edit_time_zone(call.message)
-            case "set_verification":
-                self.command_handler.set_verification_status(call.message, data.get("value", ""))
-            case "confirm_terminate":
-                try:
-                    self.command_handler.terminate_thread(thread_id=data.get("thread_id"),
-                                                          user_id=data.get("user_id"))
-                except Exception:
-                    logger.error(_("Failed to terminate the thread"))
-                    self.bot.send_message(self.group_id, _("Failed to terminate the thread"))
-            case "cancel_terminate":
-                self.bot.edit_message_text(_("Operation cancelled"),
-                                           call.message.chat.id, call.message.message_id)
-            case "delete_banned_thread":
-                if "thread_id" not in data:
-                    self.bot.delete_message(self.group_id, call.message.message_id)
-                    self.bot.send_message(self.group_id, _("Invalid action"), reply_markup=markup)
-                    return
-                self.bot.delete_message(self.group_id, call.message.message_id)
+        handler = self._admin_dispatch.get(action)
+        if handler is None:
+            logger.error("Invalid action received: %s", action)
+            return
+        for field in _REQUIRED_FIELDS.get(action, ()):
+            value = data.get(field)
+            if value is None:
+                return self._invalid_action(call)
+            if field in _INT_FIELDS:
                 try:
-                    self.command_handler.terminate_thread(thread_id=data["thread_id"])
-                    self.bot.send_message(self.group_id, _("Thread deleted"))
-                except Exception as e:
-                    logger.error(_("Failed to delete thread: {}").format(str(e)))
-                    self.bot.send_message(self.group_id, _("Failed to delete thread"))
-            case "spam_keywords":
-                self.admin_handler.spam_keywords_menu(call.message)
-            case "add_spam_keyword":
-                self.admin_handler.add_spam_keyword(call.message)
-            case "view_spam_keywords":
-                self.admin_handler.view_spam_keywords(call.message, page=data.get("page", 1))
-            case "select_spam_keyword":
-                if "idx" not in data:
-                    self.bot.delete_message(self.group_id, call.message.message_id)
-                    self.bot.send_message(self.group_id, _("Invalid action"), reply_markup=markup)
-                    return
-                self.admin_handler.select_spam_keyword(call.message, data["idx"])
-            case "delete_spam_keyword":
-                if "idx" not in data:
-                    self.bot.delete_message(self.group_id, call.message.message_id)
-                    self.bot.send_message(self.group_id, _("Invalid action"), reply_markup=markup)
-                    return
-                self.admin_handler.delete_spam_keyword(call.message, data["idx"])
-            case "blocked_reply_settings":
-                self.admin_handler.blocked_reply_settings_menu(call.message)
-            case "set_blocked_reply_enabled":
-                if "value" not in data:
-                    self.bot.delete_message(self.group_id, call.message.message_id)
-                    self.bot.send_message(self.group_id, _("Invalid action"), reply_markup=markup)
-                    return
-                self.admin_handler.set_blocked_reply_enabled(call.message, data["value"])
-            case "edit_blocked_reply_message":
-                self.admin_handler.edit_blocked_reply_message(call.message)
-            case "clear_blocked_reply_message":
-                self.admin_handler.clear_blocked_reply_message(call.message)
-            case "reset_spam_topic":
-                self.admin_handler.reset_spam_topic(call.message)
-            case "confirm_reset_spam_topic":
-                self.admin_handler.confirm_reset_spam_topic(call.message)
-            case "show_host_ip":
-                self.admin_handler.show_host_ip(call.message)
-            case "approve_appeal":
-                if "user_id" not in data:
-                    self.bot.delete_message(self.group_id, call.message.message_id)
-                    self.bot.send_message(self.group_id, _("Invalid action"), reply_markup=markup)
-                    return
-                self._handle_approve_appeal(call, data["user_id"])
-            case "reject_appeal":
-                if "user_id" not in data:
-                    self.bot.delete_message(self.group_id, call.message.message_id)
-                    self.bot.send_message(self.group_id, _("Invalid action"), reply_markup=markup)
-                    return
-                self._handle_reject_appeal(call, data["user_id"])
-            case "appeal_management":
-                self.admin_handler.appeal_management_menu(call.message)
-            case "view_pending_appeals":
-                self.admin_handler.view_pending_appeals(call.message)
-            case "view_all_appeals":
-                self.admin_handler.view_all_appeals(call.message)
-            case "toggle_appeal_mode":
-                self.admin_handler.toggle_appeal_mode(call.message)
-            case _:
-                logger.error(_("Invalid action received") + action)
+                    data[field] = int(value)
+                except (TypeError, ValueError):
+                    return self._invalid_action(call)
+        handler(call, data)
+
+    def _invalid_action(self, call: types.CallbackQuery):
+        """Replace an admin panel whose callback data is missing or has malformed required fields."""
+        markup = types.InlineKeyboardMarkup()
+        back_button = types.InlineKeyboardButton("⬅️" + _("Back"), callback_data=payloads.MENU)
+        markup.add(back_button)
+        self.bot.delete_message(self.group_id, call.message.message_id)
+        self.bot.send_message(self.group_id, _("Invalid action"), reply_markup=markup)
+
+    def _do_set_captcha(self, call: types.CallbackQuery, data: dict):
+        self.admin_handler.set_captcha(call.message, data["value"])
+        self._invalidate_captcha_setting()
+
+    def _do_set_turnstile_enabled(self, call: types.CallbackQuery, data: dict):
+        # Disabling Turnstile may switch the captcha setting away from webapp
+        self.admin_handler.set_turnstile_enabled(call.message, data.get("value"))
+        self._invalidate_captcha_setting()
+
+    def _do_confirm_terminate(self, call: types.CallbackQuery, data: dict):
+        try:
+            self.command_handler.terminate_thread(thread_id=data.get("thread_id"),
+                                                  user_id=data.get("user_id"))
+        except Exception:
+            logger.error(_("Failed to terminate the thread"))
+            self.bot.send_message(self.group_id, _("Failed to terminate the thread"))
+
+    def _do_delete_banned_thread(self, call: types.CallbackQuery, data: dict):
+        self.bot.delete_message(self.group_id, call.message.message_id)
+        try:
+            self.command_handler.terminate_thread(thread_id=data["thread_id"])
+            self.bot.send_message(self.group_id, _("Thread deleted"))
+        except Exception as e:
+            logger.error("Failed to delete thread: %s", e)
+            self.bot.send_message(self.group_id, _("Failed to delete thread"))
 
     def _handle_approve_appeal(self, call: types.CallbackQuery, user_id: int):
         """Handle admin approval of user appeal."""
-        import sqlite3
-
-        with sqlite3.connect(self.db_path) as db:
+        with self._pool.acquire() as db:
             cursor = db.cursor()
+            # Take the write lock up front so the three writes below run as a
+            # single transaction without a mid-way SHARED -> RESERVED upgrade.
+            cursor.execute("BEGIN IMMEDIATE")
 
             # Update appeal status
-            cursor.execute(
-                """UPDATE appeal_requests
-                   SET status = 'approved', admin_id = ?, handled_at = CURRENT_TIMESTAMP
-                   WHERE user_id = ?""",
-                (call.from_user.id, user_id)
-            )
+            cursor.execute(SQL_UPDATE_APPEAL_STATUS, ("approved", call.from_user.id, user_id))
 
             # Unblock user
-            cursor.execute("DELETE FROM blocked_users WHERE user_id = ?", (user_id,))
+            cursor.execute(SQL_DELETE_BLOCKED_USER, (user_id,))
 
             # Reset verification attempts
-            cursor.execute("DELETE FROM verification_attempts WHERE user_id = ?", (user_id,))
-
-            db.commit()
-
-            # Notify user
-            self.bot.send_message(
-                user_id,
-                _("✅ Good news! Your appeal has been approved by an administrator.\n\n"
-                  "You can now send messages again. Please complete the verification process.")
-            )
-
-            # Update admin message
-            self.bot.edit_message_text(
-                _("✅ Appeal Approved\n\n"
-                  "User ID: {}\n"
-                  "Approved by: {} (ID: {})\n"
-                  "Action: User unblocked and verification attempts reset").format(
-                    user_id, call.from_user.first_name, call.from_user.id
-                ),
-                call.message.chat.id,
-                call.message.message_id
-            )
-
-            logger.info(_("Appeal approved for user {} by admin {}").format(user_id, call.from_user.id))
+            cursor.execute(SQL_DELETE_VERIFICATION_ATTEMPTS, (user_id,))
+        invalidate_blocked_user_ids()
+
+        # Notify user
+        self.bot.send_message(user_id, self._msg_appeal_approved_user)
+
+        # Update admin message
+        self.bot.edit_message_text(
+            self._msg_appeal_approved_admin.format(user_id, call.from_user.first_name, call.from_user.id),
+            call.message.chat.id,
+            call.message.message_id
+        )
+
+        logger.info("Appeal approved for user %s by admin %s", user_id, call.from_user.id)
 
     def _handle_reject_appeal(self, call: types.CallbackQuery, user_id: int):
         """Handle admin rejection of user appeal."""
-        import sqlite3
-
-        with sqlite3.connect(self.db_path) as db:
+        with self._pool.acquire() as db:
             cursor = db.cursor()
 
             # Update appeal status
-            cursor.execute(
-                """UPDATE appeal_requests
-                   SET status = 'rejected', admin_id = ?, handled_at = CURRENT_TIMESTAMP
-                   WHERE user_id = ?""",
-                (call.from_user.id, user_id)
-            )
-
-            db.commit()
-
-            # Notify user
-            self.bot.send_message(
-                user_id,
-                _("❌ Your appeal has been reviewed and rejected by an administrator.\n\n"
-                  "The block remains in effect. No further appeals are allowed.")
-            )
-
-            # Update admin message
-            self.bot.edit_message_text(
-                _("❌ Appeal Rejected\n\n"
-                  "User ID: {}\n"
-                  "Rejected by: {} (ID: {})\n"
-                  "Action: User remains blocked").format(
-                    user_id, call.from_user.first_name, call.from_user.id
-                ),
-                call.message.chat.id,
-                call.message.message_id
-            )
-
-            logger.info(_("Appeal rejected for user {} by admin {}").format(user_id, call.from_user.id))
+            cursor.execute(SQL_UPDATE_APPEAL_STATUS, ("rejected", call.from_user.id, user_id))
+
+        # Notify user
+        self.bot.send_message(user_id, self._msg_appeal_rejected_user)
+
+        # Update admin message
+        self.bot.edit_message_text(
+            self._msg_appeal_rejected_admin.format(user_id, call.from_user.first_name, call.from_user.id),
+            call.message.chat.id,
+            call.message.message_id
+        )
+
+        logger.info("Appeal rejected for user %s by admin %s", user_id, call.from_user.id)
 
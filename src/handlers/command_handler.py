@@ -1,7 +1,6 @@
 # pyright: reportUnusedCallResult=false
 """Command handling module."""
 
-import json
 import sqlite3
 from datetime import datetime
 
@@ -10,12 +9,17 @@ from telebot.apihelper import ApiTelegramException, delete_forum_topic, close_fo
 from telebot.types import Message
 
 from src.config import logger, _
+from src.utils import callback_payloads as payloads
+from src.utils.blocking import invalidate_blocked_user_ids
+from src.utils.db_helper import open_db
+from src.utils.topic_cache import TopicCache
 
 
 class CommandHandler:
     """Handles bot commands."""
 
-    def __init__(self, bot, group_id: int, db_path: str, cache, time_zone, captcha_manager, spam_detector=None):
+    def __init__(self, bot, group_id: int, db_path: str, cache, time_zone, captcha_manager, spam_detector=None,
+                 topic_cache=None):
         self.bot = bot
         self.group_id = group_id
         self.db_path = db_path
@@ -23,6 +27,7 @@ class CommandHandler:
         self._time_zone = time_zone  # Keep as fallback
         self.captcha_manager = captcha_manager
         self.spam_detector = spam_detector
+        self.topic_cache = topic_cache if topic_cache is not None else TopicCache()
 
     @property
     def time_zone(self):
@@ -64,7 +69,7 @@ class CommandHandler:
             self.bot.send_message(message.chat.id, _("This command is only available to admin users."))
             return
 
-        with sqlite3.connect(self.db_path) as db:
+        with open_db(self.db_path, isolation_level="DEFERRED") as db:
             db_cursor = db.cursor()
             # Get user_id from thread
             db_cursor.execute("SELECT user_id FROM topics WHERE thread_id = ? LIMIT 1",
@@ -81,6 +86,7 @@ class CommandHandler:
                 # Remove user from verified list and revoke any active priority tier.
                 self.captcha_manager.remove_user_verification(user_id, db)
                 db.commit()
+                invalidate_blocked_user_ids()
             else:
                 self.bot.send_message(self.group_id, _("User not found"),
                                       message_thread_id=message.message_thread_id)
@@ -90,7 +96,7 @@ class CommandHandler:
         markup = types.InlineKeyboardMarkup()
         markup.add(types.InlineKeyboardButton(
             "🗑️ " + _("Delete This Thread"),
-            callback_data=json.dumps({"action": "delete_banned_thread", "thread_id": message.message_thread_id})
+            callback_data=payloads.action("delete_banned_thread", thread_id=message.message_thread_id)
         ))
 
         self.bot.send_message(self.group_id, _("User banned"),
@@ -150,6 +156,7 @@ class CommandHandler:
                     # Remove from blocked_users table
                     db_cursor.execute("DELETE FROM blocked_users WHERE user_id = ?", (user_id,))
                     db.commit()
+                    invalidate_blocked_user_ids()
             self.bot.send_message(self.group_id, _("User unbanned"),
                                   message_thread_id=message.message_thread_id)
             try:
@@ -169,6 +176,7 @@ class CommandHandler:
                 # Remove from blocked_users table
                 db_cursor.execute("DELETE FROM blocked_users WHERE user_id = ?", (user_id,))
                 db.commit()
+                invalidate_blocked_user_ids()
 
                 # Try to reopen thread if it exists
                 db_cursor.execute("SELECT thread_id FROM topics WHERE user_id = ? LIMIT 1", (user_id,))
@@ -182,7 +190,7 @@ class CommandHandler:
 
             markup = types.InlineKeyboardMarkup()
             markup.add(types.InlineKeyboardButton("⬅️" + _("Back"),
-                                                  callback_data=json.dumps({"action": "menu"})))
+                                                  callback_data=payloads.MENU))
             if message.from_user is not None and message.from_user.id == self.bot.get_me().id:
                 self.bot.edit_message_text(_("User unbanned"), message.chat.id, message.message_id,
                                            reply_markup=markup)
@@ -215,8 +223,7 @@ class CommandHandler:
                     db.commit()
 
             if db_user_id and db_thread_id:
-                self.cache.delete(f"chat_{db_user_id}_threadid")
-                self.cache.delete(f"threadid_{db_thread_id}_userid")
+                self.topic_cache.forget(db_user_id, db_thread_id)
                 db_cursor.execute("DELETE FROM messages WHERE topic_id = ?", (db_thread_id,))
                 db.commit()
 
@@ -263,14 +270,14 @@ class CommandHandler:
             markup = types.InlineKeyboardMarkup()
             confirm_button = types.InlineKeyboardButton(
                 f"✅{_('Confirm')}",
-                callback_data=json.dumps(
-                    {"action": "confirm_terminate", "thread_id": thread_id} if thread_id is not None else
-                    {"action": "confirm_terminate", "user_id": user_id}
+                callback_data=(
+                    payloads.action("confirm_terminate", thread_id=thread_id) if thread_id is not None else
+                    payloads.action("confirm_terminate", user_id=user_id)
                 )
             )
             cancel_button = types.InlineKeyboardButton(
                 f"❌{_('Cancel')}",
-                callback_data=json.dumps({"action": "cancel_terminate"})
+                callback_data=payloads.action("cancel_terminate")
             )
             markup.add(confirm_button, cancel_button)
             self.bot.reply_to(message, _("Are you sure you want to terminate this thread?"),
@@ -324,15 +331,15 @@ class CommandHandler:
         markup.row(
             types.InlineKeyboardButton(
                 _("Mark verified"),
-                callback_data=json.dumps({"action": "set_verification", "value": "verified"})),
+                callback_data=payloads.action("set_verification", value="verified")),
             types.InlineKeyboardButton(
                 _("Remove verification"),
-                callback_data=json.dumps({"action": "set_verification", "value": "unverified"})),
+                callback_data=payloads.action("set_verification", value="unverified")),
         )
         return markup
 
     def _set_topic_verification(self, message: Message, verified: bool):
-        with sqlite3.connect(self.db_path) as db:
+        with open_db(self.db_path, isolation_level="DEFERRED") as db:
             cursor = db.cursor()
             cursor.execute(
                 "SELECT user_id FROM topics WHERE thread_id = ?",
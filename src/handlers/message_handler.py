@@ -1,27 +1,106 @@
 """Message handling module."""
 
-import html
-import sqlite3
+import logging
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 
+from telebot import types
 from telebot.apihelper import ApiTelegramException, create_forum_topic
 from telebot.formatting import apply_html_entities
 from telebot.types import Message
 
 from src.config import logger, _
+from src.utils import callback_payloads as payloads
 from src.utils.blocking import (
     BLOCKED_REPLY_COOLDOWN_SECONDS,
+    BLOCKED_REPLY_SETTING_KEY,
+    blocked_user_ids,
+    cache_blocked_reply_setting,
+    invalidate_blocked_user_ids,
     remaining_block_seconds,
     temporary_block_message,
 )
-from src.utils.helpers import escape_markdown
+from src.utils.db_helper import ConnectionPool
+from src.utils.helpers import escape_html, escape_markdown
+from src.utils.topic_cache import TopicCache
+
+# SQL statements
+SQL_SELECT_FORWARDED_ID = (
+    "SELECT forwarded_id FROM messages WHERE received_id = ? AND topic_id = ? AND in_group = ? LIMIT 1")
+SQL_SELECT_RECEIVED_ID = (
+    "SELECT received_id FROM messages WHERE forwarded_id = ? AND topic_id = ? AND in_group = ? LIMIT 1")
+SQL_INSERT_MESSAGE = "INSERT INTO messages (received_id, forwarded_id, topic_id, in_group) VALUES (?, ?, ?, ?)"
+SQL_SELECT_THREAD_BY_USER = "SELECT thread_id FROM topics WHERE user_id = ? LIMIT 1"
+SQL_SELECT_USER_BY_THREAD = "SELECT user_id FROM topics WHERE thread_id = ? LIMIT 1"
+SQL_INSERT_TOPIC = "INSERT INTO topics (user_id, thread_id) VALUES (?, ?)"
+SQL_DELETE_TOPIC = "DELETE FROM topics WHERE thread_id = ?"
+
+# Telegram errors meaning the spam topic is gone; matched without lowercasing the error text.
+_SPAM_TOPIC_MISSING_RE = re.compile(r"message thread not found|topic", re.IGNORECASE)
+
+# Content type -> (bot method, builder for its type-specific arguments); one
+# dict lookup instead of walking a match statement for every forwarded message.
+_SENDERS = {
+    "photo": ("send_photo", lambda m, text, caption: {
+        "photo": m.photo[-1].file_id, "caption": caption, "parse_mode": "HTML"}),
+    "text": ("send_message", lambda m, text, caption: {
+        "text": text, "parse_mode": "HTML"}),
+    "sticker": ("send_sticker", lambda m, text, caption: {
+        "sticker": m.sticker.file_id}),
+    "video": ("send_video", lambda m, text, caption: {
+        "video": m.video.file_id, "caption": caption, "parse_mode": "HTML"}),
+    "document": ("send_document", lambda m, text, caption: {
+        "document": m.document.file_id, "caption": caption, "parse_mode": "HTML"}),
+    "audio": ("send_audio", lambda m, text, caption: {
+        "audio": m.audio.file_id, "caption": caption, "parse_mode": "HTML"}),
+    "voice": ("send_voice", lambda m, text, caption: {
+        "voice": m.voice.file_id, "caption": caption, "parse_mode": "HTML"}),
+    "animation": ("send_animation", lambda m, text, caption: {
+        "animation": m.animation.file_id, "caption": caption, "parse_mode": "HTML"}),
+    "contact": ("send_contact", lambda m, text, caption: {
+        "phone_number": m.contact.phone_number,
+        "first_name": m.contact.first_name,
+        "last_name": m.contact.last_name}),
+}
+
+
+@lru_cache(maxsize=1024)
+def _appeal_markup(user_id: int) -> str:
+    """Return the serialized Appeal button shown to an auto-blocked user."""
+    markup = types.InlineKeyboardMarkup()
+    markup.add(types.InlineKeyboardButton(
+        _("Appeal"),
+        callback_data=payloads.action("appeal_request", user_id=user_id)
+    ))
+    # telebot passes string markup through as-is instead of re-serializing it per send
+    return markup.to_json()
+
+
+def _appeal_review_markup(user_id: int) -> str:
+    """Return the serialized Approve/Reject buttons for an appeal awaiting review."""
+    markup = types.InlineKeyboardMarkup()
+    markup.row(
+        types.InlineKeyboardButton(
+            _("✅ Approve"),
+            callback_data=payloads.action("approve_appeal", user_id=user_id)
+        ),
+        types.InlineKeyboardButton(
+            _("❌ Reject"),
+            callback_data=payloads.action("reject_appeal", user_id=user_id)
+        )
+    )
+    return markup.to_json()
 
 
 class MessageHandler:
     """Handles message forwarding between users and group."""
 
     def __init__(self, bot, group_id: int, db_path: str, cache, captcha_manager, auto_response_manager,
-                 spam_detector_manager=None, bot_instance=None):
+                 spam_detector_manager=None, bot_instance=None, topic_cache=None):
         self.bot = bot
         self.group_id = group_id
         self.db_path = db_path
@@ -30,6 +109,22 @@ class MessageHandler:
         self.auto_response_manager = auto_response_manager
         self.spam_detector_manager = spam_detector_manager
         self.bot_instance = bot_instance
+        self.topic_cache = topic_cache if topic_cache is not None else TopicCache()
+        self._pool = ConnectionPool(db_path, size=4)
+        self._thread_locks = {}
+        self._thread_locks_guard = threading.Lock()
+        # Topic info messages are posted off the forwarding path; nothing waits on them.
+        self._pin_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pin")
+        self._captcha_prompts = {
+            "webapp": self._prompt_webapp_captcha,
+            "math": self._prompt_math_captcha,
+            "image": self._prompt_image_captcha,
+        }
+
+    def close(self):
+        """Release pooled database connections and the info-message worker."""
+        self._pin_executor.shutdown(wait=True)
+        self._pool.close()
 
     def check_valid_chat(self, message: Message) -> bool:
         """Check if message is in valid chat context."""
@@ -41,44 +136,60 @@ class MessageHandler:
         if self.check_valid_chat(message):
             return
 
+        # Each step borrows a pooled connection only for its own queries, so
+        # Telegram calls never hold one of the few connections
+        if message.chat.id != self.group_id:
+            self._handle_user_message(message)
+        else:
+            self._handle_group_message(message)
+
+    @staticmethod
+    def _render_html(message: Message) -> tuple[str | None, str | None]:
+        """
+        Render the message text and caption as HTML for forwarding.
+
+        Called only once a message is actually forwarded, so blocked, captcha-gated
+        and rate-limited messages never pay for the entity walk or escaping.
+        """
         if message.text:
-            msg_text = apply_html_entities(message.text, message.entities, None) if message.entities else html.escape(
+            msg_text = apply_html_entities(message.text, message.entities, None) if message.entities else escape_html(
                 message.text)
         else:
             msg_text = None
 
         if message.caption:
             msg_caption = apply_html_entities(message.caption, message.entities,
-                                              None) if message.entities else html.escape(message.caption)
+                                              None) if message.entities else escape_html(message.caption)
         else:
             msg_caption = None
-
-        with sqlite3.connect(self.db_path) as db:
-            cursor = db.cursor()
-
-            if message.chat.id != self.group_id:
-                self._handle_user_message(message, msg_text, msg_caption, cursor, db)
-            else:
-                self._handle_group_message(message, msg_text, msg_caption, cursor, db)
+        return msg_text, msg_caption
 
     def can_process_private_action(self, message: Message) -> bool:
         """Apply the verification gate before a private command or edit action."""
-        with sqlite3.connect(self.db_path) as db:
-            return self._check_captcha(message, db.cursor(), db)
+        return self._check_captcha(message)
 
-    def _handle_user_message(self, message: Message, msg_text: str, msg_caption: str, cursor, db):
+    def _is_user_verified(self, user_id: int) -> bool:
+        """Check verification, borrowing a connection in case the cache misses."""
+        with self._pool.acquire() as db:
+            return self.captcha_manager.is_user_verified(user_id, db)
+
+    def _handle_user_message(self, message: Message):
         """Handle messages from users."""
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
+        # Skip translating and formatting the timing lines when INFO is filtered out
+        log_info = logger.isEnabledFor(logging.INFO)
 
-        logger.info(
-            _("Received message from {}, content: {}, type: {}").format(
-                message.from_user.id, message.text, message.content_type))
+        if log_info:
+            logger.info(
+                _("Received message from {}, content: {}, type: {}").format(
+                    message.from_user.id, message.text, message.content_type))
 
         # Captcha handler
-        if not self._check_captcha(message, cursor, db):
-            processing_time = (time.time() - start_time) * 1000
-            logger.info(_("Message from user {} blocked by captcha ({:.2f}ms)").format(
-                message.from_user.id, processing_time))
+        if not self._check_captcha(message):
+            if log_info:
+                processing_ms = (time.perf_counter_ns() - start_ns) / 1_000_000
+                logger.info(_("Message from user {} blocked by captcha ({:.2f}ms)").format(
+                    message.from_user.id, processing_ms))
             return
 
         # Check for spam using detector manager
@@ -89,90 +200,13 @@ class MessageHandler:
             is_spam_detected, spam_info = self.spam_detector_manager.detect_spam(message)
 
             if is_spam_detected:
-                # Get spam topic ID from cache
-                spam_topic_id = self.cache.get("spam_topic_id")
-                if spam_topic_id is None:
-                    # Fallback to main topic if spam topic not configured
-                    spam_topic_id = None
-                    logger.warning(_("Spam topic not configured, using main topic"))
-
-                # Forward directly to spam topic without creating user thread
-                try:
-                    fwd_msg = self._send_message_by_type(message, msg_text, msg_caption,
-                                                         self.group_id, spam_topic_id, None, silent=True)
-
-                    # Build alert message based on detection info
-                    alert_msg = f"🚫 {_('[Spam Detected]')}\n"
-                    alert_msg += f"{_('User ID')}: {message.from_user.id}\n"
-
-                    if spam_info:
-                        if "detector" in spam_info:
-                            alert_msg += f"{_('Detector')}: {spam_info['detector']}\n"
-                        if "method" in spam_info:
-                            alert_msg += f"{_('Method')}: {spam_info['method']}\n"
-                        if "matched" in spam_info:
-                            alert_msg += f"{_('Matched')}: {spam_info['matched']}\n"
-                        if "confidence" in spam_info:
-                            alert_msg += f"{_('Confidence')}: {spam_info['confidence']:.2%}\n"
-
-                    self.bot.send_message(
-                        self.group_id,
-                        alert_msg,
-                        message_thread_id=spam_topic_id,
-                        reply_to_message_id=fwd_msg.message_id,
-                        disable_notification=True
-                    )
-                except ApiTelegramException as e:
-                    # If spam topic not found, try to recreate it
-                    if "message thread not found" in str(e).lower() or "topic" in str(e).lower():
-                        logger.warning(_("Spam topic not found, attempting to recreate..."))
-                        if self.bot_instance:
-                            try:
-                                self.bot_instance._create_spam_topic()
-                                spam_topic_id = self.cache.get("spam_topic_id")
-                                logger.info(_("Spam topic recreated, retrying message forward..."))
-
-                                # Retry forwarding
-                                fwd_msg = self._send_message_by_type(message, msg_text, msg_caption,
-                                                                     self.group_id, spam_topic_id, None, silent=True)
-
-                                # Build and send alert message
-                                alert_msg = f"🚫 {_('[Spam Detected]')}\n"
-                                alert_msg += f"{_('User ID')}: {message.from_user.id}\n"
-                                if spam_info:
-                                    if "detector" in spam_info:
-                                        alert_msg += f"{_('Detector')}: {spam_info['detector']}\n"
-                                    if "method" in spam_info:
-                                        alert_msg += f"{_('Method')}: {spam_info['method']}\n"
-                                    if "matched" in spam_info:
-                                        alert_msg += f"{_('Matched')}: {spam_info['matched']}\n"
-
-                                self.bot.send_message(
-                                    self.group_id,
-                                    alert_msg,
-                                    message_thread_id=spam_topic_id,
-                                    reply_to_message_id=fwd_msg.message_id,
-                                    disable_notification=True
-                                )
-                            except Exception as retry_error:
-                                logger.error(
-                                    _("Failed to recreate spam topic and forward message: {}").format(str(retry_error)))
-                                # Fallback to main topic
-                                self.bot.send_message(
-                                    self.group_id,
-                                    f"⚠️ {_('[Spam - Topic Error]')}\n{_('User ID')}: {message.from_user.id}",
-                                    message_thread_id=None,
-                                    disable_notification=True
-                                )
-                        else:
-                            logger.error(_("Cannot recreate spam topic: bot instance not available"))
-                    else:
-                        logger.error(_("Failed to forward spam message: {}").format(str(e)))
+                self._forward_spam(message, spam_info)
 
                 # Log processing time
-                processing_time = (time.time() - start_time) * 1000
-                logger.info(_("Spam message from user {} processed in {:.2f}ms (matched: {})").format(
-                    message.from_user.id, processing_time, spam_info.get('matched', 'unknown')))
+                if log_info:
+                    processing_ms = (time.perf_counter_ns() - start_ns) / 1_000_000
+                    logger.info(_("Spam message from user {} processed in {:.2f}ms (matched: {})").format(
+                        message.from_user.id, processing_ms, spam_info.get('matched', 'unknown')))
 
                 # Done, return early
                 return
@@ -181,12 +215,12 @@ class MessageHandler:
         auto_response = self._handle_auto_response(message)
 
         # Forward message to group
-        thread_id = self._get_or_create_thread(message, cursor, db)
+        thread_id = self._get_or_create_thread(message)
         if thread_id is None:
             return
 
         # Forward the message
-        fwd_msg = self._forward_to_group(message, msg_text, msg_caption, thread_id, cursor)
+        fwd_msg = self._forward_to_group(message, thread_id)
         if fwd_msg is None:
             return
 
@@ -195,23 +229,90 @@ class MessageHandler:
                                   message_thread_id=thread_id)
 
         # Log processing time
-        processing_time = (time.time() - start_time) * 1000  # Convert to milliseconds
-        logger.info(_("Message from user {} processed in {:.2f}ms").format(
-            message.from_user.id, processing_time))
+        if log_info:
+            processing_ms = (time.perf_counter_ns() - start_ns) / 1_000_000
+            logger.info(_("Message from user {} processed in {:.2f}ms").format(
+                message.from_user.id, processing_ms))
+
+    @staticmethod
+    def _build_spam_alert(user_id: int, spam_info) -> str:
+        """Build the admin alert posted under a forwarded spam message."""
+        parts = [f"🚫 {_('[Spam Detected]')}", f"{_('User ID')}: {user_id}"]
+        if spam_info:
+            if "detector" in spam_info:
+                parts.append(f"{_('Detector')}: {spam_info['detector']}")
+            if "method" in spam_info:
+                parts.append(f"{_('Method')}: {spam_info['method']}")
+            if "matched" in spam_info:
+                parts.append(f"{_('Matched')}: {spam_info['matched']}")
+            if "confidence" in spam_info:
+                parts.append(f"{_('Confidence')}: {spam_info['confidence']:.2%}")
+        return "\n".join(parts)
+
+    def _send_spam_to_topic(self, message: Message, msg_text: str, msg_caption: str, spam_info, spam_topic_id):
+        """Forward a spam message silently to the spam topic and reply to it with an alert."""
+        fwd_msg = self._send_message_by_type(message, msg_text, msg_caption,
+                                             self.group_id, spam_topic_id, None, silent=True)
+        self.bot.send_message(
+            self.group_id,
+            self._build_spam_alert(message.from_user.id, spam_info),
+            message_thread_id=spam_topic_id,
+            reply_to_message_id=fwd_msg.message_id,
+            disable_notification=True
+        )
 
-    def _check_captcha(self, message: Message, cursor, db) -> bool:
+    def _forward_spam(self, message: Message, spam_info):
+        """Forward a detected spam message without creating a user thread."""
+        msg_text, msg_caption = self._render_html(message)
+        spam_topic_id = self.cache.get("spam_topic_id")
+        if spam_topic_id is None:
+            # Fallback to main topic if spam topic not configured
+            logger.warning(_("Spam topic not configured, using main topic"))
+
+        try:
+            self._send_spam_to_topic(message, msg_text, msg_caption, spam_info, spam_topic_id)
+        except ApiTelegramException as e:
+            # If spam topic not found, try to recreate it
+            if not _SPAM_TOPIC_MISSING_RE.search(str(e)):
+                logger.error(_("Failed to forward spam message: {}").format(str(e)))
+                return
+            logger.warning(_("Spam topic not found, attempting to recreate..."))
+            if not self.bot_instance:
+                logger.error(_("Cannot recreate spam topic: bot instance not available"))
+                return
+            try:
+                self.bot_instance._create_spam_topic()
+                spam_topic_id = self.cache.get("spam_topic_id")
+                logger.info(_("Spam topic recreated, retrying message forward..."))
+                self._send_spam_to_topic(message, msg_text, msg_caption, spam_info, spam_topic_id)
+            except Exception as retry_error:
+                logger.error(
+                    _("Failed to recreate spam topic and forward message: {}").format(str(retry_error)))
+                # Fallback to main topic
+                self.bot.send_message(
+                    self.group_id,
+                    f"⚠️ {_('[Spam - Topic Error]')}\n{_('User ID')}: {message.from_user.id}",
+                    message_thread_id=None,
+                    disable_notification=True
+                )
+
+    def _check_captcha(self, message: Message) -> bool:
         """Handle verification and allow only verified users to continue."""
 
         user_id = message.from_user.id
 
         # FIRST: Check if user is blocked - if so, don't generate any captcha
-        blocked_result = cursor.execute(
-            """SELECT block_reason, blocked_until FROM blocked_users
-               WHERE user_id = ?
-                 AND (blocked_until IS NULL OR blocked_until > CURRENT_TIMESTAMP)
-               LIMIT 1""",
-            (user_id,)
-        ).fetchone()
+        blocked_result = None
+        with self._pool.acquire() as db:
+            cursor = db.cursor()
+            if user_id in blocked_user_ids(self.db_path, cursor):
+                blocked_result = cursor.execute(
+                    """SELECT block_reason, blocked_until FROM blocked_users
+                       WHERE user_id = ?
+                         AND (blocked_until IS NULL OR blocked_until > CURRENT_TIMESTAMP)
+                       LIMIT 1""",
+                    (user_id,)
+                ).fetchone()
 
         if blocked_result:
             block_reason, blocked_until = blocked_result
@@ -230,7 +331,7 @@ class MessageHandler:
                     self.cache.delete(f"captcha_{user_id}")
 
                     # Submit appeal
-                    self._submit_appeal(user_id, message.from_user, db, cursor)
+                    self._submit_appeal(user_id, message.from_user)
                     return False
                 else:
                     # Wrong answer
@@ -253,17 +354,10 @@ class MessageHandler:
                 # User is blocked - show different messages based on block reason
                 if block_reason == "auto_attempts":
                     # Auto-blocked: show appeal button
-                    import json
-                    from telebot import types
-                    markup = types.InlineKeyboardMarkup()
-                    markup.add(types.InlineKeyboardButton(
-                        _("Appeal"),
-                        callback_data=json.dumps({"action": "appeal_request", "user_id": user_id})
-                    ))
                     self.bot.send_message(
                         message.chat.id,
                         _("❌ Your account has been blocked. If you believe this is a mistake, you can submit an appeal (one-time opportunity)."),
-                        reply_markup=markup
+                        reply_markup=_appeal_markup(user_id)
                     )
                 elif block_reason == "rate_limit":
                     self.bot.send_message(
@@ -272,11 +366,11 @@ class MessageHandler:
                     )
                 else:
                     # Admin blocked: send custom blocked user reply
-                    if self.cache.get("setting_blocked_user_reply_enabled") == "enable":
-                        blocked_user_reply = self.cache.get("setting_blocked_user_reply_message")
-                    else:
-                        blocked_user_reply = None
-                    if blocked_user_reply:
+                    reply_setting = self.cache.get(BLOCKED_REPLY_SETTING_KEY)
+                    if reply_setting is None:
+                        reply_setting = cache_blocked_reply_setting(self.cache)
+                    reply_enabled, blocked_user_reply = reply_setting
+                    if reply_enabled and blocked_user_reply:
                         self.bot.send_message(message.chat.id, blocked_user_reply)
                     else:
                         # Default message if no custom reply set
@@ -291,35 +385,29 @@ class MessageHandler:
             if self.captcha_manager.is_webapp_pending(user_id):
                 return False
             if not self.captcha_manager.verify_captcha(user_id, message.text):
-                # Wrong answer - record attempt
-                attempt_count = self.captcha_manager.record_attempt(user_id, db)
+                # Wrong answer - record attempt, and auto-block once the limit is hit
+                with self._pool.acquire() as db:
+                    attempt_count = self.captcha_manager.record_attempt(user_id, db)
+                    if attempt_count >= 3:
+                        self.captcha_manager.block_user_by_attempts(
+                            user_id,
+                            message.from_user.username,
+                            message.from_user.first_name,
+                            message.from_user.last_name,
+                            db
+                        )
                 logger.info(_("User {} entered incorrect answer (attempt {}/3)").format(user_id, attempt_count))
 
                 # Check if user has exceeded max attempts
                 if attempt_count >= 3:
-                    # Auto-block user
-                    self.captcha_manager.block_user_by_attempts(
-                        user_id,
-                        message.from_user.username,
-                        message.from_user.first_name,
-                        message.from_user.last_name,
-                        db
-                    )
                     logger.warning(_("User {} auto-blocked after 3 failed attempts").format(user_id))
 
                     # Send notification with appeal button
-                    import json
-                    from telebot import types
-                    markup = types.InlineKeyboardMarkup()
-                    markup.add(types.InlineKeyboardButton(
-                        _("Appeal"),
-                        callback_data=json.dumps({"action": "appeal_request", "user_id": user_id})
-                    ))
                     self.bot.send_message(
                         user_id,
                         _("❌ You have been blocked after 3 failed verification attempts.\n\n"
                           "If you believe this is a mistake, you can submit an appeal (one-time opportunity)."),
-                        reply_markup=markup
+                        reply_markup=_appeal_markup(user_id)
                     )
                     self.cache.delete(f"captcha_{user_id}")
                     return False
@@ -340,14 +428,14 @@ class MessageHandler:
 
             # Correct answer - verify user
             logger.info(_("User {} passed the captcha").format(user_id))
-            self.bot.send_message(message.chat.id, _("✅ Verification successful! You can now send messages."))
-            self.captcha_manager.set_user_verified(user_id, db)
-            self.captcha_manager.reset_attempts(user_id, db)  # Reset attempt counter
+            with self._pool.acquire() as db:
+                self.captcha_manager.complete_verification(user_id, db)
             self.cache.delete(f"captcha_{user_id}")
+            self.bot.send_message(message.chat.id, _("✅ Verification successful! You can now send messages."))
             return False
 
         # Check if the user is verified
-        if not self.captcha_manager.is_user_verified(user_id, db):
+        if not self._is_user_verified(user_id):
             logger.info(_("User {} is not verified").format(user_id))
 
             # Rate limiting - prevent spam verification requests
@@ -365,26 +453,27 @@ class MessageHandler:
                                   reply_to_message_id=message.message_id)
 
             captcha_type = self._get_captcha_type()
-            match captcha_type:
-                case "webapp":
-                    self.captcha_manager.generate_captcha(
-                        user_id, captcha_type, purpose="normal")
-                    return False
-                case "math":
-                    captcha = self.captcha_manager.generate_captcha(user_id, captcha_type)
-                    self.bot.send_message(message.chat.id,
-                                          _("Please solve the following math problem and send the answer:\n\n") + captcha)
-                    return False
-                case "image":
-                    self.captcha_manager.generate_captcha(user_id, captcha_type)
-                    return False
-                case _:
-                    logger.error(_("Invalid captcha setting"))
-                    self.bot.send_message(self.group_id,
-                                          _("Invalid captcha setting") + f": {self.cache.get('setting_captcha')}")
-                    return False
+            prompt = self._captcha_prompts.get(captcha_type)
+            if prompt is None:
+                logger.error(_("Invalid captcha setting"))
+                self.bot.send_message(self.group_id, _("Invalid captcha setting") + f": {captcha_type}")
+                return False
+            prompt(message, user_id)
+            return False
         return True
 
+    def _prompt_webapp_captcha(self, message: Message, user_id: int):
+        self.captcha_manager.generate_captcha(user_id, "webapp", purpose="normal")
+
+    def _prompt_math_captcha(self, message: Message, user_id: int):
+        captcha = self.captcha_manager.generate_captcha(user_id, "math")
+        self.bot.send_message(message.chat.id,
+                              _("Please solve the following math problem and send the answer:\n\n") + captcha)
+
+    def _prompt_image_captcha(self, message: Message, user_id: int):
+        # The captcha manager sends the image itself
+        self.captcha_manager.generate_captcha(user_id, "image")
+
     def _get_captcha_type(self) -> str:
         """Return an enforced captcha type, safely handling legacy settings."""
         captcha_type = self.cache.get("setting_captcha")
@@ -404,36 +493,49 @@ class MessageHandler:
                 fallback))
         return fallback
 
-    def _submit_appeal(self, user_id: int, user, db, cursor):
+    def _submit_appeal(self, user_id: int, user):
         """Submit an appeal request after successful verification."""
-        import json
-        from telebot import types
+        appeal_mode = self.cache.get("setting_appeal_mode") or "manual"
+        auto_approve = appeal_mode == "auto"
 
-        # Check if user has already appealed
-        existing_appeal = cursor.execute(
-            "SELECT status FROM appeal_requests WHERE user_id = ?",
-            (user_id,)
-        ).fetchone()
+        with self._pool.acquire() as db:
+            cursor = db.cursor()
+            # Check if user has already appealed
+            existing_appeal = cursor.execute(
+                "SELECT status FROM appeal_requests WHERE user_id = ?",
+                (user_id,)
+            ).fetchone()
+
+            # Record appeal request. In auto mode the approval and unblock go into
+            # the same transaction, so the whole decision is written with one commit.
+            if existing_appeal:
+                pass
+            elif auto_approve:
+                cursor.execute(
+                    """INSERT INTO appeal_requests (user_id, appeal_time, status, handled_at)
+                       VALUES (?, CURRENT_TIMESTAMP, 'approved', CURRENT_TIMESTAMP)""",
+                    (user_id,)
+                )
+                cursor.execute("DELETE FROM blocked_users WHERE user_id = ?", (user_id,))
+            else:
+                cursor.execute(
+                    """INSERT INTO appeal_requests (user_id, appeal_time, status)
+                       VALUES (?, CURRENT_TIMESTAMP, 'pending')""",
+                    (user_id,)
+                )
 
         if existing_appeal:
             status = existing_appeal[0]
             if status == 'pending':
                 self.bot.send_message(user_id, _("Your appeal is already pending review"))
-                return
             elif status == 'approved':
                 self.bot.send_message(user_id, _("Your appeal was already approved"))
-                return
             elif status == 'rejected':
                 self.bot.send_message(user_id, _("Your appeal was already rejected. No further appeals allowed."))
-                return
+            return
 
-        # Record appeal request
-        cursor.execute(
-            """INSERT INTO appeal_requests (user_id, appeal_time, status)
-               VALUES (?, CURRENT_TIMESTAMP, 'pending')""",
-            (user_id,)
-        )
-        db.commit()
+        if auto_approve:
+            invalidate_blocked_user_ids()
 
         # Notify user
         self.bot.send_message(
@@ -444,23 +546,10 @@ class MessageHandler:
 
         # Get user info
         username = user.username or "N/A"
-        first_name = user.first_name or ""
-        last_name = user.last_name or ""
-        full_name = f"{first_name} {last_name}".strip() or "N/A"
-
-        appeal_mode = self.cache.get("setting_appeal_mode") or "manual"
-
-        if appeal_mode == "auto":
-            # Auto-approve: unblock user immediately but mark as "on watch"
-            cursor.execute("DELETE FROM blocked_users WHERE user_id = ?", (user_id,))
-            cursor.execute(
-                """UPDATE appeal_requests
-                   SET status = 'approved', handled_at = CURRENT_TIMESTAMP
-                   WHERE user_id = ?""",
-                (user_id,)
-            )
-            db.commit()
+        full_name = " ".join(p for p in (user.first_name, user.last_name) if p) or "N/A"
 
+        if auto_approve:
+            # Auto-approved: user is unblocked but "on watch"
             self.bot.send_message(
                 user_id,
                 _("✅ Your appeal has been automatically approved.\n\n"
@@ -479,18 +568,6 @@ class MessageHandler:
             )
         else:
             # Manual mode: send to admin for approval
-            markup = types.InlineKeyboardMarkup()
-            markup.row(
-                types.InlineKeyboardButton(
-                    _("✅ Approve"),
-                    callback_data=json.dumps({"action": "approve_appeal", "user_id": user_id})
-                ),
-                types.InlineKeyboardButton(
-                    _("❌ Reject"),
-                    callback_data=json.dumps({"action": "reject_appeal", "user_id": user_id})
-                )
-            )
-
             self.bot.send_message(
                 self.group_id,
                 _("🔔 New Appeal Request\n\n"
@@ -498,7 +575,7 @@ class MessageHandler:
                   "Username: @{}\n"
                   "Reason: Auto-blocked after 3 failed verification attempts\n\n"
                   "Please review and decide:").format(full_name, user_id, username),
-                reply_markup=markup
+                reply_markup=_appeal_review_markup(user_id)
             )
 
     def _handle_auto_response(self, message: Message):
@@ -520,62 +597,97 @@ class MessageHandler:
             return auto_response_result["response"]
         return None
 
-    def _get_or_create_thread(self, message: Message, cursor, db) -> int:
+    @contextmanager
+    def _user_thread_lock(self, userid: int):
+        """Hold a per-user lock, dropping it from the registry once no thread needs it."""
+        with self._thread_locks_guard:
+            entry = self._thread_locks.get(userid)
+            if entry is None:
+                entry = self._thread_locks[userid] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._thread_locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._thread_locks[userid]
+
+    def _get_or_create_thread(self, message: Message) -> int:
         """Get or create a thread for the user."""
         userid = message.from_user.id
-        if (thread_id := self.cache.get(f"chat_{userid}_threadid")) is None:
-            result = cursor.execute("SELECT thread_id FROM topics WHERE user_id = ? LIMIT 1", (userid,))
-            thread_id = result.fetchone()
+        if (thread_id := self.topic_cache.thread_id(userid)) is not None:
+            return thread_id
+
+        # Concurrent first messages from one user must not each create a topic;
+        # later arrivals wait here and pick up the committed row or cache entry.
+        with self._user_thread_lock(userid):
+            if (thread_id := self.topic_cache.thread_id(userid)) is not None:
+                return thread_id
+
+            with self._pool.acquire() as db:
+                thread_id = db.execute(SQL_SELECT_THREAD_BY_USER, (userid,)).fetchone()
             if thread_id is None:
                 # Create a new thread
                 logger.info(_("Creating a new thread for user {}").format(userid))
+                user = message.from_user
+                first_name, last_name, username = user.first_name, user.last_name, user.username
                 try:
                     topic = create_forum_topic(chat_id=self.group_id,
-                                               name=f"{message.from_user.first_name} | {userid}",
+                                               name=f"{first_name} | {userid}",
                                                token=self.bot.token)
                 except Exception as e:
                     logger.error(e)
                     return None
-                cursor.execute("INSERT INTO topics (user_id, thread_id) VALUES (?, ?)",
-                               (userid, topic["message_thread_id"]))
-                db.commit()
+                with self._pool.acquire() as db:
+                    db.execute(SQL_INSERT_TOPIC, (userid, topic["message_thread_id"]))
                 thread_id = topic["message_thread_id"]
 
                 # Send and pin user info message asynchronously to avoid blocking
-                try:
-                    username = _("Not set") if message.from_user.username is None else f"@{message.from_user.username}"
-                    last_name = "" if message.from_user.last_name is None else f" {message.from_user.last_name}"
-                    pin_message = self.bot.send_message(self.group_id,
-                                                        f"User ID: [{userid}](tg://openmessage?user_id={userid})\n"
-                                                        f"Full Name: {escape_markdown(f'{message.from_user.first_name}{last_name}')}\n"
-                                                        f"Username: {escape_markdown(username)}\n",
-                                                        message_thread_id=thread_id, parse_mode='markdown')
-                    self.bot.pin_chat_message(self.group_id, pin_message.message_id)
-                except Exception as e:
-                    # Don't fail message forwarding if pinning fails
-                    logger.warning(f"Failed to pin info message for user {userid}: {e}")
+                self._pin_executor.submit(self._send_and_pin_info, userid, thread_id,
+                                          first_name, last_name, username)
             else:
                 thread_id = thread_id[0]
-            self.cache.set(f"chat_{userid}_threadid", thread_id)
+            self.topic_cache.remember(userid, thread_id)
         return thread_id
 
-    def _forward_to_group(self, message: Message, msg_text: str, msg_caption: str,
-                          thread_id: int, cursor) -> Message:
+    def _send_and_pin_info(self, userid: int, thread_id: int, first_name, last_name, username):
+        """Post and pin the user info message at the top of a new topic."""
+        try:
+            full_name = " ".join(p for p in (first_name, last_name) if p)
+            username = _("Not set") if username is None else f"@{username}"
+            info_text = "\n".join((
+                f"User ID: [{userid}](tg://openmessage?user_id={userid})",
+                f"Full Name: {escape_markdown(full_name)}",
+                f"Username: {escape_markdown(username)}",
+                "",
+            ))
+            pin_message = self.bot.send_message(self.group_id, info_text,
+                                                message_thread_id=thread_id, parse_mode='markdown')
+            self.bot.pin_chat_message(self.group_id, pin_message.message_id)
+        except Exception as e:
+            # Don't fail message forwarding if pinning fails
+            logger.warning(f"Failed to pin info message for user {userid}: {e}")
+
+    def _forward_to_group(self, message: Message, thread_id: int) -> Message:
         """Forward a message to the group."""
+        msg_text, msg_caption = self._render_html(message)
         try:
-            reply_id = self._get_reply_id(message, thread_id, cursor, in_group=False)
+            reply_id = None
+            if message.reply_to_message is not None:
+                with self._pool.acquire() as db:
+                    reply_id = self._get_reply_id(message, thread_id, db.cursor(), in_group=False)
             fwd_msg = self._send_message_by_type(message, msg_text, msg_caption,
                                                  self.group_id, thread_id, reply_id)
-            cursor.execute(
-                "INSERT INTO messages (received_id, forwarded_id, topic_id, in_group) VALUES (?, ?, ?, ?)",
-                (message.message_id, fwd_msg.message_id, thread_id, False))
+            with self._pool.acquire() as db:
+                db.execute(SQL_INSERT_MESSAGE, (message.message_id, fwd_msg.message_id, thread_id, False))
             return fwd_msg
         except ApiTelegramException as e:
             if "message thread not found" in str(e):
-                cursor.execute("DELETE FROM topics WHERE thread_id = ?", (thread_id,))
-                cursor.connection.commit()
-                self.cache.delete(f"threadid_{thread_id}_userid")
-                self.cache.delete(f"chat_{message.from_user.id}_threadid")
+                with self._pool.acquire() as db:
+                    db.execute(SQL_DELETE_TOPIC, (thread_id,))
+                self.topic_cache.forget(message.from_user.id, thread_id)
                 # Re-queue the message
                 return None
             logger.error(_("Failed to forward message from user {}").format(message.from_user.id))
@@ -586,26 +698,31 @@ class MessageHandler:
             self.bot.forward_message(self.group_id, message.chat.id, message_id=message.message_id)
             return None
 
-    def _handle_group_message(self, message: Message, msg_text: str, msg_caption: str, cursor, db):
+    def _handle_group_message(self, message: Message):
         """Handle messages from group to users."""
-        if (user_id := self.cache.get(f"threadid_{message.message_thread_id}_userid")) is None:
-            result = cursor.execute("SELECT user_id FROM topics WHERE thread_id = ? LIMIT 1",
-                                    (message.message_thread_id,))
-            user_id = result.fetchone()
-            user_id = user_id[0] if user_id is not None else None
+        user_id = self.topic_cache.user_id(message.message_thread_id)
+        reply_id = None
+        if user_id is None or message.reply_to_message is not None:
+            with self._pool.acquire() as db:
+                cursor = db.cursor()
+                if user_id is None:
+                    row = cursor.execute(SQL_SELECT_USER_BY_THREAD, (message.message_thread_id,)).fetchone()
+                    if row is not None:
+                        user_id = row[0]
+                        self.topic_cache.remember(user_id, message.message_thread_id)
+                if user_id is not None and message.reply_to_message is not None:
+                    reply_id = self._get_reply_id(message, message.message_thread_id, cursor, in_group=True)
 
         if user_id is not None:
-            self.cache.set(f"threadid_{message.message_thread_id}_userid", user_id)
-            reply_id = self._get_reply_id(message, message.message_thread_id, cursor, in_group=True)
+            msg_text, msg_caption = self._render_html(message)
 
             try:
                 fwd_msg = self._send_message_by_type(message, msg_text, msg_caption,
                                                      user_id, None, reply_id)
-                cursor.execute(
-                    "INSERT INTO messages (received_id, forwarded_id, topic_id, in_group) VALUES (?, ?, ?, ?)",
-                    (message.message_id, fwd_msg.message_id, message.message_thread_id, True))
-                if (self.bot_instance
-                        and self.captcha_manager.is_user_verified(user_id, db)):
+                with self._pool.acquire() as db:
+                    db.execute(SQL_INSERT_MESSAGE,
+                               (message.message_id, fwd_msg.message_id, message.message_thread_id, True))
+                if self.bot_instance and self._is_user_verified(user_id):
                     self.bot_instance.mark_user_replied(user_id)
             except ApiTelegramException as e:
                 logger.error(_("Failed to forward message to user {}").format(user_id))
@@ -625,18 +742,12 @@ class MessageHandler:
                 pass
 
     def _get_reply_id(self, message: Message, topic_id: int, cursor, in_group: bool):
-        """Get the reply message ID if replying to a message."""
-        if message.reply_to_message is None:
-            return None
-
-        if message.reply_to_message.from_user.id == message.from_user.id:
-            cursor.execute(
-                "SELECT forwarded_id FROM messages WHERE received_id = ? AND topic_id = ? AND in_group = ? LIMIT 1",
-                (message.reply_to_message.message_id, topic_id, in_group))
+        """Get the counterpart ID of the replied-to message; callers check that it is a reply."""
+        reply = message.reply_to_message
+        if reply.from_user.id == message.from_user.id:
+            cursor.execute(SQL_SELECT_FORWARDED_ID, (reply.message_id, topic_id, in_group))
         else:
-            cursor.execute(
-                "SELECT received_id FROM messages WHERE forwarded_id = ? AND topic_id = ? AND in_group = ? LIMIT 1",
-                (message.reply_to_message.message_id, topic_id, not in_group))
+            cursor.execute(SQL_SELECT_RECEIVED_ID, (reply.message_id, topic_id, not in_group))
 
         if (result := cursor.fetchone()) is not None:
             return int(result[0])
@@ -646,55 +757,11 @@ class MessageHandler:
                               chat_id: int, thread_id: int = None, reply_id: int = None,
                               silent: bool = False) -> Message:
         """Send a message based on its type."""
-        match message.content_type:
-            case "photo":
-                return self.bot.send_photo(chat_id=chat_id, photo=message.photo[-1].file_id,
-                                           caption=msg_caption, message_thread_id=thread_id,
-                                           reply_to_message_id=reply_id, parse_mode='HTML',
-                                           disable_notification=silent)
-            case "text":
-                return self.bot.send_message(chat_id=chat_id, text=msg_text,
-                                             message_thread_id=thread_id,
-                                             reply_to_message_id=reply_id, parse_mode='HTML',
-                                             disable_notification=silent)
-            case "sticker":
-                return self.bot.send_sticker(chat_id=chat_id, sticker=message.sticker.file_id,
-                                             message_thread_id=thread_id,
-                                             reply_to_message_id=reply_id,
-                                             disable_notification=silent)
-            case "video":
-                return self.bot.send_video(chat_id=chat_id, video=message.video.file_id,
-                                           caption=msg_caption, message_thread_id=thread_id,
-                                           reply_to_message_id=reply_id, parse_mode='HTML',
-                                           disable_notification=silent)
-            case "document":
-                return self.bot.send_document(chat_id=chat_id, document=message.document.file_id,
-                                              caption=msg_caption, message_thread_id=thread_id,
-                                              reply_to_message_id=reply_id, parse_mode='HTML',
-                                              disable_notification=silent)
-            case "audio":
-                return self.bot.send_audio(chat_id=chat_id, audio=message.audio.file_id,
-                                           caption=msg_caption, message_thread_id=thread_id,
-                                           reply_to_message_id=reply_id, parse_mode='HTML',
-                                           disable_notification=silent)
-            case "voice":
-                return self.bot.send_voice(chat_id=chat_id, voice=message.voice.file_id,
-                                           caption=msg_caption, message_thread_id=thread_id,
-                                           reply_to_message_id=reply_id, parse_mode='HTML',
-                                           disable_notification=silent)
-            case "animation":
-                return self.bot.send_animation(chat_id=chat_id, animation=message.animation.file_id,
-                                               caption=msg_caption, message_thread_id=thread_id,
-                                               reply_to_message_id=reply_id, parse_mode='HTML',
-                                               disable_notification=silent)
-            case "contact":
-                return self.bot.send_contact(chat_id=chat_id,
-                                             phone_number=message.contact.phone_number,
-                                             first_name=message.contact.first_name,
-                                             last_name=message.contact.last_name,
-                                             message_thread_id=thread_id,
-                                             reply_to_message_id=reply_id,
-                                             disable_notification=silent)
-            case _:
-                logger.error(_("Unsupported message type") + message.content_type)
-                raise ValueError(_("Unsupported message type") + message.content_type)
+        try:
+            method, build_payload = _SENDERS[message.content_type]
+        except KeyError:
+            logger.error(_("Unsupported message type") + message.content_type)
+            raise ValueError(_("Unsupported message type") + message.content_type) from None
+        return getattr(self.bot, method)(
+            chat_id=chat_id, message_thread_id=thread_id, reply_to_message_id=reply_id,
+            disable_notification=silent, **build_payload(message, msg_text, msg_caption))
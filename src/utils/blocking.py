@@ -1,6 +1,8 @@
 """Shared helpers for temporary-block status and presentation."""
 
 import math
+import threading
+import time
 from datetime import datetime, timezone
 
 from src.config import _
@@ -8,6 +10,57 @@ from src.config import _
 
 BLOCKED_REPLY_COOLDOWN_SECONDS = 60
 
+# Combined (enabled, message) entry so a blocked-user reply needs one cache read
+BLOCKED_REPLY_SETTING_KEY = "setting_blocked_user_reply"
+
+# Writers invalidate the blocked-ID snapshot after every blocked_users change;
+# the TTL only bounds staleness for rows edited outside the bot.
+BLOCKED_IDS_TTL_SECONDS = 300
+
+_blocked_ids_lock = threading.Lock()
+_blocked_ids = {}
+_blocked_ids_generation = 0
+
+
+def blocked_user_ids(db_path: str, cursor) -> frozenset:
+    """
+    Return the IDs that have a blocked_users row, loading them at most once per TTL.
+
+    The set may still contain expired temporary blocks, so membership only means
+    the caller has to check the row itself; absence means the user is not blocked.
+    """
+    now = time.monotonic()
+    with _blocked_ids_lock:
+        cached = _blocked_ids.get(db_path)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        generation = _blocked_ids_generation
+
+    ids = frozenset(row[0] for row in cursor.execute("SELECT user_id FROM blocked_users"))
+    with _blocked_ids_lock:
+        # Drop the result if a writer invalidated the snapshot while it was loading
+        if generation == _blocked_ids_generation:
+            _blocked_ids[db_path] = (now + BLOCKED_IDS_TTL_SECONDS, ids)
+    return ids
+
+
+def invalidate_blocked_user_ids():
+    """Discard blocked-ID snapshots; call after committing a blocked_users change."""
+    global _blocked_ids_generation
+    with _blocked_ids_lock:
+        _blocked_ids_generation += 1
+        _blocked_ids.clear()
+
+
+def cache_blocked_reply_setting(cache) -> tuple[bool, str | None]:
+    """Rebuild the combined blocked-user reply entry from the individual settings."""
+    setting = (
+        cache.get("setting_blocked_user_reply_enabled") == "enable",
+        cache.get("setting_blocked_user_reply_message"),
+    )
+    cache.set(BLOCKED_REPLY_SETTING_KEY, setting)
+    return setting
+
 
 def remaining_block_seconds(blocked_until) -> int | None:
     """Return the number of seconds until an SQLite UTC timestamp expires."""
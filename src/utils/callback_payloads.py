@@ -0,0 +1,25 @@
+"""Inline keyboard callback payloads."""
+
+import json
+from functools import lru_cache
+
+
+@lru_cache(maxsize=256)
+def action(name: str, **fields) -> str:
+    """
+    Return the compact JSON callback data for an action.
+
+    Menus are re-rendered on every navigation, so payloads are memoized
+    instead of encoding a fresh dict for each button.
+
+    Args:
+        name: Callback action name
+        **fields: Extra payload fields, e.g. ``page`` or ``id``
+
+    Returns:
+        str: JSON callback data
+    """
+    return json.dumps({"action": name, **fields}, separators=(",", ":"))
+
+
+MENU = action("menu")
@@ -1,15 +1,57 @@
 """Captcha functionality for BetterForward Enhance."""
 
+import hmac
 import os
 import random
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from io import BytesIO
+from itertools import islice
 
 from diskcache import Cache
 from PIL import Image, ImageDraw, ImageFont
 from telebot import types
 
-from src.config import _
+from src.config import logger, _
+from src.utils.blocking import invalidate_blocked_user_ids
+from src.utils.memcache import TTLMap
+
+VERIFIED_CACHE_TTL = 1800
+CAPTCHA_FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+CAPTCHA_IMAGE_SIZE = (200, 80)
+# Palette size for the encoded PNG; keeps the digits' anti-aliasing legible
+CAPTCHA_PALETTE_COLORS = 16
+CAPTCHA_NOISE_LINES = 5
+CAPTCHA_NOISE_POINTS = 100
+
+# SQL statements
+SQL_SELECT_VERIFIED = "SELECT EXISTS(SELECT 1 FROM verified_users WHERE user_id = ?)"
+SQL_INSERT_VERIFIED = "INSERT OR REPLACE INTO verified_users (user_id) VALUES (?)"
+SQL_DELETE_VERIFIED = "DELETE FROM verified_users WHERE user_id = ?"
+SQL_UPSERT_ATTEMPT = """INSERT INTO verification_attempts (user_id, attempt_count, last_attempt_time)
+    VALUES (?, 1, CURRENT_TIMESTAMP)
+    ON CONFLICT(user_id) DO UPDATE SET
+        attempt_count = attempt_count + 1,
+        last_attempt_time = CURRENT_TIMESTAMP
+    RETURNING attempt_count"""
+SQL_SELECT_ATTEMPT_COUNT = "SELECT attempt_count FROM verification_attempts WHERE user_id = ?"
+SQL_SELECT_BLOCKED_BY_ATTEMPTS = "SELECT blocked_by_attempts FROM verification_attempts WHERE user_id = ?"
+SQL_DELETE_ATTEMPTS = "DELETE FROM verification_attempts WHERE user_id = ?"
+SQL_MARK_BLOCKED_BY_ATTEMPTS = "UPDATE verification_attempts SET blocked_by_attempts = 1 WHERE user_id = ?"
+SQL_BLOCK_USER_BY_ATTEMPTS = """INSERT OR REPLACE INTO blocked_users
+    (user_id, username, first_name, last_name, block_reason, blocked_at)
+    VALUES (?, ?, ?, ?, 'auto_attempts', CURRENT_TIMESTAMP)"""
+
+
+@lru_cache(maxsize=1)
+def _load_captcha_font():
+    """Parse the captcha font once per process; drawing with it is read-only."""
+    try:
+        return ImageFont.truetype(CAPTCHA_FONT_PATH, 40)
+    except Exception:
+        # Fallback to default font
+        return ImageFont.load_default()
 
 
 class CaptchaManager:
@@ -21,6 +63,26 @@ class CaptchaManager:
         self.cache = cache
         self.priority_revoker = priority_revoker
         self.webapp_service = webapp_service
+        # Verification status per user ID, checked on every incoming message
+        self._verified = TTLMap()
+        self._font = _load_captcha_font()
+        self._blank_image = Image.new('RGB', CAPTCHA_IMAGE_SIZE, color='white')
+        self._blank_mask = Image.new('L', CAPTCHA_IMAGE_SIZE, 0)
+        # Answers only use digits, so each glyph is rasterized once up front
+        self._digit_masks = {digit: self._rasterize_glyph(digit) for digit in "0123456789"}
+        # Image captchas are rendered and uploaded off the dispatch path
+        self._send_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="captcha")
+
+    def close(self):
+        """Finish pending image captcha uploads."""
+        self._send_executor.shutdown(wait=True)
+
+    def _rasterize_glyph(self, char: str) -> Image.Image:
+        """Return a mask that pasted at (x, y) matches draw.text((x, y), char)."""
+        _left, _top, right, bottom = self._font.getbbox(char)
+        tile = Image.new('L', (right, bottom), 0)
+        ImageDraw.Draw(tile).text((0, 0), char, font=self._font, fill=255)
+        return tile
 
     def _revoke_priority(self, user_id: int):
         self.cache.delete(f"priority_user_{user_id}")
@@ -34,8 +96,8 @@ class CaptchaManager:
             case "math":
                 num1 = random.randint(1, 50)
                 num2 = random.randint(1, 50)
-                answer = num1 + num2
-                self.cache.set(f"captcha_{user_id}", answer, 300)
+                # Stored as text, the form answers arrive in
+                self.cache.set(f"captcha_{user_id}", str(num1 + num2), 300)
                 return f"{num1} + {num2} = ?"
             case "webapp":
                 if not self.webapp_service or not self.webapp_service.is_enabled():
@@ -62,7 +124,8 @@ class CaptchaManager:
         captcha = self.cache.get(f"captcha_{user_id}")
         if captcha is None:
             return False
-        return str(answer) == str(captcha)
+        # Compared as bytes: compare_digest rejects non-ASCII str input
+        return hmac.compare_digest(str(answer).encode(), str(captcha).encode())
 
     def is_webapp_pending(self, user_id: int) -> bool:
         challenge = self.cache.get(f"captcha_{user_id}")
@@ -70,111 +133,88 @@ class CaptchaManager:
 
     def is_user_verified(self, user_id: int, db) -> bool:
         """Check if a user is verified."""
-        verified = self.cache.get(f"verified_{user_id}")
+        verified = self._verified.get(user_id)
         if verified is None:
-            cursor = db.cursor()
-            result = cursor.execute("SELECT 1 FROM verified_users WHERE user_id = ? LIMIT 1",
-                                    (user_id,))
-            verified = result.fetchone() is not None
-            self.cache.set(f"verified_{user_id}", verified, 1800)
+            verified = bool(db.execute(SQL_SELECT_VERIFIED, (user_id,)).fetchone()[0])
+            self._verified.set(user_id, verified, VERIFIED_CACHE_TTL)
         return bool(verified)
 
+    def cached_verification(self, user_id: int) -> bool:
+        """Return the cached verification status without touching the database."""
+        return bool(self._verified.get(user_id))
+
+    def forget_verification(self, user_id: int):
+        """Drop the cached verification status so the next check reads the database."""
+        self._verified.delete(user_id)
+
     def set_user_verified(self, user_id: int, db):
         """Mark a user as verified."""
-        cursor = db.cursor()
-        cursor.execute("INSERT OR REPLACE INTO verified_users (user_id) VALUES (?)", (user_id,))
+        db.execute(SQL_INSERT_VERIFIED, (user_id,))
         db.commit()
-        self.cache.set(f"verified_{user_id}", True, 1800)
+        self._verified.set(user_id, True, VERIFIED_CACHE_TTL)
+
+    def complete_verification(self, user_id: int, db):
+        """Mark a user as verified and clear their failed attempts in one commit."""
+        db.execute(SQL_INSERT_VERIFIED, (user_id,))
+        db.execute(SQL_DELETE_ATTEMPTS, (user_id,))
+        db.commit()
+        self._verified.set(user_id, True, VERIFIED_CACHE_TTL)
 
     def remove_user_verification(self, user_id: int, db):
         """Remove user verification status."""
-        cursor = db.cursor()
-        cursor.execute("DELETE FROM verified_users WHERE user_id = ?", (user_id,))
+        db.execute(SQL_DELETE_VERIFIED, (user_id,))
         db.commit()
-        self.cache.delete(f"verified_{user_id}")
+        self._verified.delete(user_id)
         self._revoke_priority(user_id)
 
     def record_attempt(self, user_id: int, db) -> int:
         """Record a failed verification attempt and return the current count."""
-        cursor = db.cursor()
-
-        # Get current attempt count
-        result = cursor.execute(
-            "SELECT attempt_count FROM verification_attempts WHERE user_id = ?",
-            (user_id,)
-        ).fetchone()
-
-        if result:
-            new_count = result[0] + 1
-            cursor.execute(
-                """UPDATE verification_attempts
-                   SET attempt_count = ?, last_attempt_time = CURRENT_TIMESTAMP
-                   WHERE user_id = ?""",
-                (new_count, user_id)
-            )
-        else:
-            new_count = 1
-            cursor.execute(
-                """INSERT INTO verification_attempts
-                   (user_id, attempt_count, last_attempt_time)
-                   VALUES (?, ?, CURRENT_TIMESTAMP)""",
-                (user_id, new_count)
-            )
-
+        new_count = db.execute(SQL_UPSERT_ATTEMPT, (user_id,)).fetchone()[0]
         db.commit()
         return new_count
 
     def get_attempt_count(self, user_id: int, db) -> int:
         """Get the number of failed verification attempts for a user."""
-        cursor = db.cursor()
-        result = cursor.execute(
-            "SELECT attempt_count FROM verification_attempts WHERE user_id = ?",
-            (user_id,)
-        ).fetchone()
+        result = db.execute(SQL_SELECT_ATTEMPT_COUNT, (user_id,)).fetchone()
         return result[0] if result else 0
 
     def reset_attempts(self, user_id: int, db):
         """Reset verification attempt count for a user (called on successful verification)."""
-        cursor = db.cursor()
-        cursor.execute("DELETE FROM verification_attempts WHERE user_id = ?", (user_id,))
+        db.execute(SQL_DELETE_ATTEMPTS, (user_id,))
         db.commit()
 
     def is_blocked_by_attempts(self, user_id: int, db) -> bool:
         """Check if a user is blocked due to too many failed attempts."""
-        cursor = db.cursor()
-        result = cursor.execute(
-            "SELECT blocked_by_attempts FROM verification_attempts WHERE user_id = ?",
-            (user_id,)
-        ).fetchone()
+        result = db.execute(SQL_SELECT_BLOCKED_BY_ATTEMPTS, (user_id,)).fetchone()
         return bool(result and result[0]) if result else False
 
     def block_user_by_attempts(self, user_id: int, username: str, first_name: str,
                                last_name: str, db) -> bool:
         """Block a user due to too many failed verification attempts."""
-        cursor = db.cursor()
-
-        # Mark in verification_attempts table
-        cursor.execute(
-            """UPDATE verification_attempts
-               SET blocked_by_attempts = 1
-               WHERE user_id = ?""",
-            (user_id,)
-        )
-
-        # Add to blocked_users table
-        cursor.execute(
-            """INSERT OR REPLACE INTO blocked_users
-               (user_id, username, first_name, last_name, block_reason, blocked_at)
-               VALUES (?, ?, ?, ?, 'auto_attempts', CURRENT_TIMESTAMP)""",
-            (user_id, username, first_name, last_name)
-        )
-
-        # Remove verification status
-        cursor.execute("DELETE FROM verified_users WHERE user_id = ?", (user_id,))
-        self.cache.delete(f"verified_{user_id}")
-        self._revoke_priority(user_id)
+        # Take the write lock up front so the three writes cannot hit a
+        # SQLITE_BUSY lock upgrade halfway through.
+        owns_transaction = not db.in_transaction
+        if owns_transaction:
+            db.execute("BEGIN IMMEDIATE")
+        try:
+            # Mark in verification_attempts table
+            db.execute(SQL_MARK_BLOCKED_BY_ATTEMPTS, (user_id,))
 
-        db.commit()
+            # Add to blocked_users table
+            db.execute(SQL_BLOCK_USER_BY_ATTEMPTS, (user_id, username, first_name, last_name))
+
+            # Remove verification status
+            db.execute(SQL_DELETE_VERIFIED, (user_id,))
+            db.commit()
+        except Exception:
+            if owns_transaction:
+                db.rollback()
+            raise
+
+        # Only drop cached state once the block is durable
+        self._verified.delete(user_id)
+        self._revoke_priority(user_id)
+        invalidate_blocked_user_ids()
         return True
 
     # ========== Image Captcha ==========
@@ -182,52 +222,63 @@ class CaptchaManager:
     def _generate_image_captcha(self, user_id: int) -> None:
         """Generate an image captcha with 4 digits."""
         # Generate random 4-digit number
-        captcha_text = ''.join([str(random.randint(0, 9)) for _ in range(4)])
+        captcha_text = f"{random.randrange(10000):04d}"
+        # Stored before the upload so an answer can never race the cache write
         self.cache.set(f"captcha_{user_id}", captcha_text, 300)
+        self._send_executor.submit(self._render_and_send, user_id, captcha_text)
 
-        # Create image
-        width, height = 200, 80
-        image = Image.new('RGB', (width, height), color='white')
-        draw = ImageDraw.Draw(image)
+        return None  # Return None because the captcha is sent by the worker
 
-        # Try to load a font, fallback to default if not available
+    def _render_and_send(self, user_id: int, captcha_text: str):
+        """Render the captcha image and send it to the user."""
         try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 40)
+            png = self._draw_png(captcha_text)
+            # telebot uploads raw bytes without a file wrapper
+            self.bot.send_photo(user_id, png, caption=_("Please enter the 4 digits shown in the image:"))
         except Exception:
-            # Fallback to default font
-            font = ImageFont.load_default()
+            logger.exception("Failed to send image captcha to user %s", user_id)
+
+    def _draw_png(self, captcha_text: str) -> bytes:
+        """Render a captcha image as PNG bytes."""
+        # Never cache the output: a reused image lets a solved challenge's hash
+        # stand in for its answer. Only the font, glyph masks and blank canvases
+        # are shared; jitter, tint and noise are drawn fresh every time.
+        # Create image
+        width, height = CAPTCHA_IMAGE_SIZE
+        image = self._blank_image.copy()
+        draw = ImageDraw.Draw(image)
+        font = self._font
 
-        # Draw text with slight randomization
+        # Compose the pre-rasterized digits into a grayscale mask, then tint
+        # them in one paste instead of one RGB text pass per character
+        mask = self._blank_mask.copy()
         x = 20
         for char in captcha_text:
             # Random y offset for each character
-            y = random.randint(15, 25)
-            # Random color (dark)
-            color = (random.randint(0, 100), random.randint(0, 100), random.randint(0, 100))
-            draw.text((x, y), char, font=font, fill=color)
+            mask.paste(self._digit_masks[char], (x, random.randint(15, 25)))
             x += 40
+        # Random color (dark)
+        image.paste((random.randint(0, 100), random.randint(0, 100), random.randint(0, 100)), mask=mask)
+
+        # All noise comes from one randbytes call instead of a random() call
+        # per value; `byte * n >> 8` maps a byte onto range(n)
+        noise = iter(random.randbytes(CAPTCHA_NOISE_LINES * 7 + CAPTCHA_NOISE_POINTS * 5))
 
         # Add noise lines
-        for _ in range(5):
-            x1, y1 = random.randint(0, width), random.randint(0, height)
-            x2, y2 = random.randint(0, width), random.randint(0, height)
-            draw.line([(x1, y1), (x2, y2)],
-                     fill=(random.randint(100, 200), random.randint(100, 200), random.randint(100, 200)),
-                     width=2)
-
-        # Add noise points
-        for _ in range(100):
-            x, y = random.randint(0, width), random.randint(0, height)
-            draw.point((x, y),
-                      fill=(random.randint(100, 200), random.randint(100, 200), random.randint(100, 200)))
-
-        # Save to BytesIO
+        for x1, y1, x2, y2, r, g, b in islice(zip(*[noise] * 7), CAPTCHA_NOISE_LINES):
+            draw.line([(x1 * width >> 8, y1 * height >> 8), (x2 * width >> 8, y2 * height >> 8)],
+                      fill=(100 + (r * 101 >> 8), 100 + (g * 101 >> 8), 100 + (b * 101 >> 8)),
+                      width=2)
+
+        # Add noise points straight into the pixel buffer; per-point ImageDraw
+        # calls cost several times more than the write itself
+        pixels = image.load()
+        for x, y, r, g, b in zip(*[noise] * 5):
+            pixels[x * width >> 8, y * height >> 8] = (
+                100 + (r * 101 >> 8), 100 + (g * 101 >> 8), 100 + (b * 101 >> 8))
+
+        # Save to BytesIO as a palettized PNG, a fraction of the RGB size
         bio = BytesIO()
-        image.save(bio, 'PNG')
-        bio.seek(0)
-
-        # Send image to user
-        self.bot.send_photo(user_id, bio, caption=_("Please enter the 4 digits shown in the image:"))
-
-        return None  # Return None because the captcha was already sent
+        image.quantize(colors=CAPTCHA_PALETTE_COLORS).save(bio, 'PNG')
+        return bio.getvalue()
 
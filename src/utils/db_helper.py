@@ -1,10 +1,56 @@
 """Database helper utilities for thread-safe operations."""
 
+import queue
 import sqlite3
+import threading
 from contextlib import contextmanager
 from functools import wraps
 
 
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA trusted_schema=OFF",
+)
+
+
+# Seconds a caller waits for a pooled connection before giving up; matches the
+# sqlite3 busy timeout used for locks.
+POOL_ACQUIRE_TIMEOUT = 30.0
+
+
+# Prepared statements kept per connection; long-lived pooled connections reuse
+# them for every repeated SQL text instead of re-preparing.
+STATEMENT_CACHE_SIZE = 256
+
+
+def open_db(db_path: str, isolation_level=None) -> sqlite3.Connection:
+    """
+    Open a SQLite connection with the shared performance settings applied.
+
+    Args:
+        db_path: Path to the SQLite database
+        isolation_level: sqlite3 isolation level; autocommit by default
+
+    Returns:
+        sqlite3.Connection: A tuned connection usable from any thread
+    """
+    conn = sqlite3.connect(
+        db_path,
+        timeout=30.0,
+        check_same_thread=False,
+        isolation_level=isolation_level,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
 @contextmanager
 def get_db_connection(db_path: str):
     """
@@ -36,6 +82,91 @@ def get_db_connection(db_path: str):
         conn.close()
 
 
+class ConnectionPool:
+    """A small thread-safe pool of long-lived SQLite connections.
+
+    Connections are opened lazily, tuned once when created, and handed out to
+    one thread at a time. ``acquire`` mirrors ``with sqlite3.connect(...)``:
+    the transaction is committed on success and rolled back on error. Hold a
+    connection only around database work, never across network calls.
+    """
+
+    def __init__(self, db_path: str, size: int = 4, timeout: float = POOL_ACQUIRE_TIMEOUT):
+        if size <= 0:
+            raise ValueError("Connection pool size must be greater than zero")
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+
+    def _get(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+        if not can_open:
+            # Every connection is already open; wait for one to be returned.
+            try:
+                return self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise TimeoutError(
+                    f"No pooled database connection became free within {self.timeout:g}s") from None
+        try:
+            return open_db(self.db_path, isolation_level="DEFERRED")
+        except Exception:
+            with self._lock:
+                self._opened -= 1
+            raise
+
+    @staticmethod
+    def _close_connection(conn: sqlite3.Connection):
+        try:
+            conn.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass
+        conn.close()
+
+    def _put(self, conn: sqlite3.Connection):
+        if self._closed:
+            self._close_connection(conn)
+            with self._lock:
+                self._opened -= 1
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def acquire(self):
+        """Borrow a connection for the duration of a ``with`` block."""
+        conn = self._get()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._put(conn)
+
+    def close(self):
+        """Close idle connections; busy ones are closed when they are returned."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close_connection(conn)
+            with self._lock:
+                self._opened -= 1
+
+
 def with_db_connection(func):
     """
     Decorator that provides a database connection to the decorated function.
@@ -7,3 +7,20 @@ def escape_markdown(text: str) -> str:
     """Escape markdown special characters."""
     escape_chars = r'\*_`\[\]()'
     return re.sub(f'([{escape_chars}])', r'\\\1', text)
+
+
+_HTML_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#x27;",
+})
+_HTML_SPECIAL_RE = re.compile(r"[&<>\"']")
+
+
+def escape_html(text: str) -> str:
+    """Escape HTML like html.escape(quote=True) in a single pass."""
+    if not _HTML_SPECIAL_RE.search(text):
+        return text
+    return text.translate(_HTML_ESCAPE_TABLE)
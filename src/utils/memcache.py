@@ -0,0 +1,38 @@
+"""Small in-process caches for state that is cheap to rebuild."""
+
+import threading
+import time
+
+
+class TTLMap:
+    """
+    Thread-safe dict whose entries expire after a per-entry TTL.
+
+    Lookups cost a dict access instead of a diskcache (SQLite) round-trip.
+    Expired entries are dropped when they are next read.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, key, default=None):
+        """Return the live value for key, or default when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return default
+            return entry[0]
+
+    def set(self, key, value, ttl: float):
+        """Store value for ttl seconds."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+
+    def delete(self, key):
+        """Remove key if present."""
+        with self._lock:
+            self._entries.pop(key, None)
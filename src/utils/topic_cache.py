@@ -0,0 +1,58 @@
+"""In-process mapping between users and their forum topics."""
+
+import threading
+from collections import OrderedDict
+
+TOPIC_CACHE_SIZE = 10_000
+
+
+class TopicCache:
+    """
+    Size-bounded, thread-safe LRU of user ID <-> topic thread ID.
+
+    The topics table stays the source of truth; an evicted or missing entry
+    only costs one indexed lookup. Keys are plain ints in both directions.
+    """
+
+    def __init__(self, maxsize: int = TOPIC_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._thread_by_user = OrderedDict()
+        self._user_by_thread = OrderedDict()
+
+    def thread_id(self, user_id: int) -> int | None:
+        """Return the cached topic for a user, or None."""
+        with self._lock:
+            return self._get(self._thread_by_user, user_id)
+
+    def user_id(self, thread_id: int) -> int | None:
+        """Return the cached user for a topic, or None."""
+        with self._lock:
+            return self._get(self._user_by_thread, thread_id)
+
+    def remember(self, user_id: int, thread_id: int):
+        """Record a user's topic in both directions."""
+        with self._lock:
+            self._put(self._thread_by_user, user_id, thread_id)
+            self._put(self._user_by_thread, thread_id, user_id)
+
+    def forget(self, user_id: int | None = None, thread_id: int | None = None):
+        """Drop the entries for a deleted topic."""
+        with self._lock:
+            if user_id is not None:
+                self._thread_by_user.pop(user_id, None)
+            if thread_id is not None:
+                self._user_by_thread.pop(thread_id, None)
+
+    @staticmethod
+    def _get(entries: OrderedDict, key: int) -> int | None:
+        value = entries.get(key)
+        if value is not None:
+            entries.move_to_end(key)
+        return value
+
+    def _put(self, entries: OrderedDict, key: int, value: int):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.maxsize:
+            entries.popitem(last=False)
@@ -13,12 +13,14 @@ sys.argv = [sys.argv[0], "-token", "test-token", "-group_id", "-100123"]
 
 from diskcache import Cache
 from src.handlers.callback_handler import CallbackHandler
+from src.utils import callback_payloads as payloads
 
 
 class FakeBot:
     def __init__(self):
         self.answers = []
         self.edits = []
+        self.sent = []
 
     def answer_callback_query(self, *args, **kwargs):
         self.answers.append((args, kwargs))
@@ -26,6 +28,12 @@ class FakeBot:
     def edit_message_text(self, *args, **kwargs):
         self.edits.append((args, kwargs))
 
+    def delete_message(self, *args, **kwargs):
+        pass
+
+    def send_message(self, *args, **kwargs):
+        self.sent.append((args, kwargs))
+
 
 class FakeWebAppService:
     def __init__(self):
@@ -107,6 +115,15 @@ class AppealCallbackTests(unittest.TestCase):
         self.assertEqual(len(bot.answers), 1)
         self.assertEqual(bot.answers[0][0][0], "appeal-callback")
 
+    def test_compact_appeal_payload_starts_verification(self):
+        captcha = FakeCaptchaManager()
+        bot, handler, call = self._callback(captcha)
+        call.data = payloads.action("appeal_request", user_id=123)
+
+        handler.handle_callback_query(call)
+
+        self.assertEqual(captcha.calls, [(123, "math", "normal")])
+
     def test_math_challenge_replaces_the_appeal_prompt(self):
         captcha = FakeCaptchaManager()
         bot, handler, call = self._callback(captcha)
@@ -154,6 +171,40 @@ class AppealCallbackTests(unittest.TestCase):
         self.assertEqual(captcha.calls, [(123, "math", "normal")])
         self.assertEqual(len(bot.edits), 1)
 
+    def test_pending_appeal_is_reported_without_starting_verification(self):
+        with sqlite3.connect(self.db_path) as db:
+            db.execute("INSERT INTO appeal_requests (user_id, status) VALUES (123, 'pending')")
+        captcha = FakeCaptchaManager()
+        bot, handler, call = self._callback(captcha)
+
+        handler._handle_appeal_request(call, {"user_id": 123})
+
+        self.assertEqual(captcha.calls, [])
+        self.assertEqual(bot.edits, [])
+        self.assertIn("already pending", bot.answers[0][0][1])
+        self.assertIsNone(self.cache.get("appeal_verification_123"))
+
+    def test_captcha_setting_change_applies_to_next_appeal(self):
+        captcha = FakeCaptchaManager()
+        bot, handler, call = self._callback(captcha)
+        handler.admin_handler.set_captcha = lambda message, value: self.cache.set("setting_captcha", value)
+
+        handler._handle_appeal_request(call, {"user_id": 123})
+        handler._handle_admin_callback(call, "set_captcha", {"action": "set_captcha", "value": "image"})
+        handler._handle_appeal_request(call, {"user_id": 123})
+
+        self.assertEqual(captcha.calls, [(123, "math", "normal"), (123, "image", "normal")])
+
+    def test_admin_appeal_decision_rejects_malformed_user_id(self):
+        bot, handler, call = self._callback(FakeCaptchaManager())
+
+        handler._handle_admin_callback(call, "approve_appeal", {"action": "approve_appeal", "user_id": "abc"})
+
+        self.assertEqual(len(bot.sent), 1)
+        self.assertEqual(bot.sent[0][0][1], "Invalid action")
+        with sqlite3.connect(self.db_path) as db:
+            self.assertIsNotNone(db.execute("SELECT 1 FROM blocked_users WHERE user_id = 123").fetchone())
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Tests for the shared blocked-user snapshot."""
+
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.argv = [sys.argv[0], "-token", "test-token", "-group_id", "-100123"]
+
+from src.utils.blocking import blocked_user_ids, invalidate_blocked_user_ids
+
+
+class BlockedUserIdsTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.directory.name) / "storage.db")
+        self.db = sqlite3.connect(self.db_path)
+        self.db.execute("CREATE TABLE blocked_users (user_id INTEGER PRIMARY KEY)")
+        self.db.execute("INSERT INTO blocked_users (user_id) VALUES (1)")
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        invalidate_blocked_user_ids()
+        self.directory.cleanup()
+
+    def test_snapshot_is_reused_until_invalidated(self):
+        self.assertEqual(blocked_user_ids(self.db_path, self.db.cursor()), {1})
+
+        self.db.execute("INSERT INTO blocked_users (user_id) VALUES (2)")
+        self.db.commit()
+        self.assertEqual(blocked_user_ids(self.db_path, self.db.cursor()), {1})
+
+        invalidate_blocked_user_ids()
+        self.assertEqual(blocked_user_ids(self.db_path, self.db.cursor()), {1, 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Regression tests for pooled SQLite connections."""
+
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.utils.db_helper import ConnectionPool
+
+
+class ConnectionPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.directory.name) / "storage.db")
+        with sqlite3.connect(self.db_path) as db:
+            db.execute("CREATE TABLE items (value INTEGER)")
+        self.pool = ConnectionPool(self.db_path, size=2)
+
+    def tearDown(self):
+        self.pool.close()
+        self.directory.cleanup()
+
+    def test_connections_are_reused_and_tuned(self):
+        with self.pool.acquire() as db:
+            first = db
+            journal_mode = db.execute("PRAGMA journal_mode").fetchone()[0]
+        with self.pool.acquire() as db:
+            self.assertIs(db, first)
+
+        self.assertEqual(journal_mode, "wal")
+
+    def test_block_commits_on_success_and_rolls_back_on_error(self):
+        with self.pool.acquire() as db:
+            db.execute("INSERT INTO items (value) VALUES (1)")
+        with self.assertRaises(RuntimeError):
+            with self.pool.acquire() as db:
+                db.execute("INSERT INTO items (value) VALUES (2)")
+                raise RuntimeError("abort")
+
+        with sqlite3.connect(self.db_path) as db:
+            rows = db.execute("SELECT value FROM items").fetchall()
+        self.assertEqual(rows, [(1,)])
+
+    def test_exhausted_pool_times_out(self):
+        pool = ConnectionPool(self.db_path, size=1, timeout=0.05)
+        try:
+            with pool.acquire():
+                with self.assertRaises(TimeoutError):
+                    with pool.acquire():
+                        pass
+            # The held connection is returned and can be borrowed again
+            with pool.acquire() as db:
+                self.assertEqual(db.execute("SELECT 1").fetchone(), (1,))
+        finally:
+            pool.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
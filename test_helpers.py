@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""Tests for shared text helpers."""
+
+import html
+import unittest
+
+from src.utils.helpers import escape_html
+
+
+class EscapeHtmlTests(unittest.TestCase):
+    def test_matches_stdlib_escape(self):
+        for text in ["plain text", "a < b & c > d", "\"quoted\" and 'single'", "&amp; already", ""]:
+            self.assertEqual(escape_html(text), html.escape(text))
+
+    def test_plain_text_is_returned_unchanged(self):
+        text = "hello world"
+        self.assertIs(escape_html(text), text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -64,17 +64,20 @@ class IngressProtectionTests(unittest.TestCase):
                         chat=SimpleNamespace(id=-100123, type="supergroup"),
                         from_user=SimpleNamespace(id=99),
                         content_type="text",
+                        text="reply",
+                        caption=None,
+                        entities=None,
                         message_thread_id=77,
                         message_id=8,
                         reply_to_message=None,
                     )
 
-                    handler._handle_group_message(message, "reply", None, db.cursor(), db)
+                    handler._handle_group_message(message)
                     self.assertEqual(promoted, [1])
 
                     captcha.remove_user_verification(1, db)
                     message.message_id = 9
-                    handler._handle_group_message(message, "reply", None, db.cursor(), db)
+                    handler._handle_group_message(message)
                     self.assertEqual(promoted, [1])
             finally:
                 cache.close()
@@ -126,6 +129,9 @@ class IngressProtectionTests(unittest.TestCase):
                     invalidate_challenge=invalidated.append)
                 app.message_queue_manager = SimpleNamespace(
                     revoke_user_priority=lambda _: None)
+                app.captcha_manager = CaptchaManager(telegram, cache)
+                with sqlite3.connect(db_path) as db:
+                    app.captcha_manager.set_user_verified(7, db)
                 message = SimpleNamespace(
                     chat=SimpleNamespace(type="private"),
                     from_user=SimpleNamespace(
@@ -142,6 +148,7 @@ class IngressProtectionTests(unittest.TestCase):
                 self.assertEqual(block[0], "rate_limit")
                 self.assertIsNotNone(block[1])
                 self.assertEqual(invalidated, [7, 7])
+                self.assertFalse(app.captcha_manager.cached_verification(7))
                 self.assertEqual(len(telegram.sent_messages), 1)
                 self.assertIn("Please try again in", telegram.sent_messages[0][0][1])
             finally:
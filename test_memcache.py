@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Tests for the in-process TTL map."""
+
+import unittest
+from unittest.mock import patch
+
+from src.utils.memcache import TTLMap
+
+
+class TTLMapTests(unittest.TestCase):
+    def test_entry_expires_after_ttl(self):
+        cache = TTLMap()
+        with patch("src.utils.memcache.time.monotonic", return_value=100.0):
+            cache.set(1, True, 30)
+        with patch("src.utils.memcache.time.monotonic", return_value=129.0):
+            self.assertIs(cache.get(1), True)
+        with patch("src.utils.memcache.time.monotonic", return_value=130.0):
+            self.assertIsNone(cache.get(1))
+
+    def test_falsy_values_are_distinguished_from_misses(self):
+        cache = TTLMap()
+        cache.set(1, False, 60)
+
+        self.assertIs(cache.get(1), False)
+        self.assertIsNone(cache.get(2))
+
+    def test_delete_drops_entry(self):
+        cache = TTLMap()
+        cache.set(1, True, 60)
+
+        cache.delete(1)
+        cache.delete(1)
+
+        self.assertIsNone(cache.get(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
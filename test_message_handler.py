@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Regression tests for user topic creation."""
+
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+sys.argv = [sys.argv[0], "-token", "test-token", "-group_id", "-100123"]
+
+from diskcache import Cache
+from src.handlers.message_handler import MessageHandler
+
+
+class FakeBot:
+    token = "test-token"
+
+    def __init__(self):
+        self.pinned = []
+
+    def send_message(self, *args, **kwargs):
+        return SimpleNamespace(message_id=1)
+
+    def pin_chat_message(self, chat_id, message_id):
+        self.pinned.append(message_id)
+
+
+class ThreadCreationTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.directory.name) / "storage.db")
+        self.cache = Cache(str(Path(self.directory.name) / "cache"))
+        self.bot = FakeBot()
+        with sqlite3.connect(self.db_path) as db:
+            db.execute("CREATE TABLE topics (user_id INTEGER, thread_id INTEGER)")
+        self.handler = MessageHandler(
+            self.bot, -100123, self.db_path, self.cache, SimpleNamespace(), SimpleNamespace())
+
+    def tearDown(self):
+        self.handler.close()
+        self.cache.close()
+        self.directory.cleanup()
+
+    def test_concurrent_first_messages_create_one_topic(self):
+        created = []
+
+        def create_forum_topic(**kwargs):
+            time.sleep(0.05)
+            created.append(kwargs["name"])
+            return {"message_thread_id": 500 + len(created)}
+
+        message = SimpleNamespace(from_user=SimpleNamespace(
+            id=7, first_name="User", last_name=None, username=None))
+        results = []
+
+        def worker():
+            results.append(self.handler._get_or_create_thread(message))
+
+        with mock.patch("src.handlers.message_handler.create_forum_topic", create_forum_topic):
+            workers = [threading.Thread(target=worker) for _ in range(4)]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+
+        self.assertEqual(len(created), 1)
+        self.assertEqual(results, [501] * 4)
+        self.assertEqual(self.handler._thread_locks, {})
+        self.handler._pin_executor.shutdown(wait=True)
+        self.assertEqual(self.bot.pinned, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""Tests for the in-process user/topic mapping."""
+
+import unittest
+
+from src.utils.topic_cache import TopicCache
+
+
+class TopicCacheTests(unittest.TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TopicCache(maxsize=2)
+        cache.remember(1, 101)
+        cache.remember(2, 102)
+        self.assertEqual(cache.thread_id(1), 101)
+
+        cache.remember(3, 103)
+
+        self.assertIsNone(cache.thread_id(2))
+        self.assertEqual(cache.thread_id(1), 101)
+        self.assertEqual(cache.user_id(103), 3)
+
+    def test_forget_drops_both_directions(self):
+        cache = TopicCache()
+        cache.remember(1, 101)
+
+        cache.forget(1, 101)
+
+        self.assertIsNone(cache.thread_id(1))
+        self.assertIsNone(cache.user_id(101))
+
+
+if __name__ == "__main__":
+    unittest.main()
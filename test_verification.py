@@ -2,12 +2,67 @@
 # pyright: reportUnusedCallResult=false
 """Verification test script."""
 
+import importlib
 import os
 import sqlite3
 import sys
+from functools import lru_cache
 
 sys.argv = [sys.argv[0], "-token", "test-token", "-group_id", "-100123"]
 
+# Test databases are throwaway, so skip journaling and fsync. Locking stays
+# NORMAL: the migrations open their own connections to the same file.
+TEST_PRAGMAS = (
+    "PRAGMA journal_mode=MEMORY",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+def _fast_connect(path):
+    """Open a test connection without durability overhead."""
+    conn = sqlite3.connect(path)
+    for pragma in TEST_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+# Migrations applied on top of the base schema, in version order
+MIGRATIONS = (
+    "20251225_verification_enhancement",
+    "20251226_rate_limit_protection",
+    "20251227_turnstile_webapp",
+    "20261015_appeal_indexes",
+    "20261016_message_reply_indexes",
+    "20261017_verified_user_index",
+)
+
+
+class MemoryCache:
+    """Dict-backed stand-in for diskcache; the tests never need persistence."""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def set(self, key, value, expire=None):
+        self.values[key] = value
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+@lru_cache(maxsize=1)
+def _captcha_font():
+    """Return the captcha font, parsed once per run, and whether it is the fallback."""
+    from PIL import ImageFont  # pyright: ignore[reportMissingImports]
+    try:
+        return ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 40), False
+    except Exception:
+        return ImageFont.load_default(), True
+
 def test_imports():
     """Test that all modules can be imported."""
     print("🔍 Testing imports...")
@@ -33,7 +88,7 @@ def test_database_migration():
             os.remove(test_db)
 
         # Initialize basic tables
-        with sqlite3.connect(test_db) as conn:
+        with _fast_connect(test_db) as conn:
             cursor = conn.cursor()
 
             # Create settings table (prerequisite)
@@ -55,16 +110,29 @@ def test_database_migration():
                     blocked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
+
+            # Create messages table (prerequisite)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    received_id INTEGER NOT NULL,
+                    forwarded_id INTEGER NOT NULL,
+                    topic_id INTEGER NOT NULL,
+                    in_group BOOLEAN NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS verified_users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL
+                )
+            """)
+            cursor.executemany("INSERT INTO verified_users (user_id) VALUES (?)", [(1,), (1,), (2,)])
             conn.commit()
 
         # Run migration
-        import importlib
-        migration = importlib.import_module("db_migrate.20251225_verification_enhancement")
-        migration.upgrade(test_db)
-        rate_limit_migration = importlib.import_module("db_migrate.20251226_rate_limit_protection")
-        rate_limit_migration.upgrade(test_db)
-        webapp_migration = importlib.import_module("db_migrate.20251227_turnstile_webapp")
-        webapp_migration.upgrade(test_db)
+        for name in MIGRATIONS:
+            importlib.import_module(f"db_migrate.{name}").upgrade(test_db)
 
         # Verify tables were created
         with sqlite3.connect(test_db) as conn:
@@ -81,12 +149,28 @@ def test_database_migration():
                 raise Exception("appeal_requests table not created")
 
             # Check block_reason column
-            cursor.execute("PRAGMA table_info(blocked_users)")
-            columns = [col[1] for col in cursor.fetchall()]
+            cursor.execute(
+                "SELECT name FROM pragma_table_info('blocked_users') "
+                "WHERE name IN ('block_reason', 'blocked_until')")
+            columns = {row[0] for row in cursor.fetchall()}
             if 'block_reason' not in columns:
                 raise Exception("block_reason column not added")
             if 'blocked_until' not in columns:
                 raise Exception("blocked_until column not added")
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND name='idx_appeal_user_status'")
+            if not cursor.fetchone():
+                raise Exception("appeal status index not created")
+            cursor.execute(
+                "EXPLAIN QUERY PLAN SELECT received_id FROM messages "
+                "WHERE forwarded_id = 1 AND topic_id = 2 AND in_group = 0")
+            if "COVERING INDEX idx_messages_forwarded" not in " ".join(row[-1] for row in cursor.fetchall()):
+                raise Exception("message reply index not used")
+            cursor.execute("SELECT user_id FROM verified_users ORDER BY user_id")
+            if cursor.fetchall() != [(1,), (2,)]:
+                raise Exception("duplicate verified users not removed")
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND name='idx_verified_user'")
+            if not cursor.fetchone():
+                raise Exception("verified user index not created")
             cursor.execute("SELECT value FROM settings WHERE key = 'webapp_enabled'")
             if cursor.fetchone() != ('disable',):
                 raise Exception("webapp settings not added")
@@ -97,9 +181,14 @@ def test_database_migration():
             print("   - block_reason column added")
             print("   - blocked_until column added")
             print("   - persistent WebApp settings added")
-
-        # Cleanup
-        os.remove(test_db)
+            print("   - appeal status index added")
+            print("   - message reply indexes added")
+            print("   - verified user index added")
+
+        # Cleanup, including the WAL sidecar files
+        for path in (test_db, f"{test_db}-wal", f"{test_db}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
         return True
     except Exception as e:
         print(f"❌ Database migration failed: {e}")
@@ -112,7 +201,6 @@ def test_captcha_manager():
     print("\n🔍 Testing CaptchaManager...")
     try:
         from src.utils.captcha import CaptchaManager
-        from diskcache import Cache
 
         # Create mock bot
         class MockBot:
@@ -121,7 +209,7 @@ def test_captcha_manager():
             def send_photo(self, *_args, **_kwargs):
                 pass
 
-        cache = Cache("/tmp/test_cache")
+        cache = MemoryCache()
         bot = MockBot()
         manager = CaptchaManager(bot, cache)
 
@@ -138,13 +226,11 @@ def test_captcha_manager():
         assert manager.verify_captcha(12345, "49") == False, "Wrong answer should fail"
         print("✅ Captcha verification works")
 
-        # Test attempt tracking
-        test_db = "/tmp/test_attempts.db"
-        if os.path.exists(test_db):
-            os.remove(test_db)
-
-        with sqlite3.connect(test_db) as db:
+        # Test attempt tracking; one connection, so the database can live in memory
+        with _fast_connect(":memory:") as db:
             cursor = db.cursor()
+            # DDL autocommits per statement otherwise; create the schema in one transaction
+            cursor.execute("BEGIN")
             cursor.execute("""
                 CREATE TABLE verification_attempts (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -171,6 +257,8 @@ def test_captcha_manager():
                     user_id INTEGER NOT NULL
                 )
             """)
+            # INSERT OR REPLACE into verified_users relies on the migrated unique index
+            cursor.execute("CREATE UNIQUE INDEX idx_verified_user ON verified_users(user_id)")
             db.commit()
 
             # Test record_attempt
@@ -189,28 +277,36 @@ def test_captcha_manager():
             assert stored_count == 3, f"Stored count should be 3, got {stored_count}"
             print("✅ Get attempt count works")
 
+            # Test complete_verification
+            manager.complete_verification(99999, db)
+            assert manager.is_user_verified(99999, db), "User should be verified"
+            assert manager.get_attempt_count(99999, db) == 0, "Attempts should be cleared"
+            print("✅ Verification completion works")
+
             # Test reset_attempts
             manager.reset_attempts(99999, db)
             stored_count = manager.get_attempt_count(99999, db)
             assert stored_count == 0, f"After reset, count should be 0, got {stored_count}"
             print("✅ Reset attempts works")
 
-            # Test block_user_by_attempts
-            manager.record_attempt(88888, db)
-            manager.record_attempt(88888, db)
-            manager.record_attempt(88888, db)
+            # Test block_user_by_attempts; record_attempt is covered above,
+            # so seed the three failed attempts in one statement
+            cursor.execute(
+                "INSERT INTO verification_attempts (user_id, attempt_count, last_attempt_time) "
+                "VALUES (?, 3, CURRENT_TIMESTAMP)",
+                (88888,)
+            )
+            db.commit()
             result = manager.block_user_by_attempts(88888, "testuser", "Test", "User", db)
             assert result == True, "Block should succeed"
 
             cursor.execute("SELECT block_reason FROM blocked_users WHERE user_id = ?", (88888,))
             reason = cursor.fetchone()
             assert reason and reason[0] == "auto_attempts", "Block reason should be auto_attempts"
+            assert manager.is_blocked_by_attempts(88888, db), "User should be blocked by attempts"
+            assert not manager.is_blocked_by_attempts(99999, db), "Verified user should not be blocked"
             print("✅ Auto-blocking works")
 
-        # Cleanup
-        os.remove(test_db)
-        cache.close()
-
         return True
     except Exception as e:
         print(f"❌ CaptchaManager test failed: {e}")
@@ -222,23 +318,22 @@ def test_image_captcha():
     """Test image captcha generation."""
     print("\n🔍 Testing image captcha generation...")
     try:
-        from PIL import Image, ImageDraw, ImageFont  # pyright: ignore[reportMissingImports]
+        from PIL import Image, ImageDraw  # pyright: ignore[reportMissingImports]
         from io import BytesIO
         import random
 
         # Generate test captcha
-        captcha_text = ''.join([str(random.randint(0, 9)) for _ in range(4)])
+        captcha_text = f"{random.randrange(10000):04d}"
         width, height = 200, 80
         image = Image.new('RGB', (width, height), color='white')
         draw = ImageDraw.Draw(image)
 
         # Try to load font
-        try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 40)
-            print("✅ Font loaded successfully")
-        except Exception:
-            font = ImageFont.load_default()
+        font, is_fallback = _captcha_font()
+        if is_fallback:
             print("⚠️  Using default font (DejaVu Sans not found)")
+        else:
+            print("✅ Font loaded successfully")
 
         # Draw text
         x = 20
@@ -258,15 +353,13 @@ def test_image_captcha():
 
         # Save to BytesIO
         bio = BytesIO()
-        image.save(bio, 'PNG')
-        bio.seek(0)
+        image.save(bio, 'PNG', compress_level=1)
 
-        assert bio.tell() == 0, "BytesIO should be at position 0"
-        data = bio.read()
-        assert len(data) > 0, "Image data should not be empty"
-        assert data[:8] == b'\x89PNG\r\n\x1a\n', "Should be valid PNG"
+        size = bio.tell()
+        assert size > 0, "Image data should not be empty"
+        assert bytes(bio.getbuffer()[:8]) == b'\x89PNG\r\n\x1a\n', "Should be valid PNG"
 
-        print(f"✅ Image captcha generated successfully ({len(data)} bytes)")
+        print(f"✅ Image captcha generated successfully ({size} bytes)")
         return True
     except Exception as e:
         print(f"❌ Image captcha test failed: {e}")
@@ -274,6 +367,46 @@ def test_image_captcha():
         traceback.print_exc()
         return False
 
+def test_image_captcha_manager():
+    """Test CaptchaManager's image captcha rendering and background send."""
+    print("\n🔍 Testing CaptchaManager image captcha...")
+    try:
+        from io import BytesIO
+        from PIL import Image  # pyright: ignore[reportMissingImports]
+        from src.utils.captcha import CaptchaManager
+
+        class PhotoBot:
+            def __init__(self):
+                self.photos = []
+            def send_photo(self, chat_id, photo, **_kwargs):
+                self.photos.append((chat_id, photo))
+
+        bot = PhotoBot()
+        manager = CaptchaManager(bot, MemoryCache())
+        assert manager.generate_captcha(12345, "image") is None, "Image captcha is sent, not returned"
+        assert manager.generate_captcha(12345, "image") is None, "Image captcha is sent, not returned"
+        # Waits for the worker to finish rendering and sending
+        manager.close()
+
+        assert [chat_id for chat_id, _photo in bot.photos] == [12345, 12345], "Both captchas should be sent"
+        first, second = (photo for _chat_id, photo in bot.photos)
+        assert isinstance(first, bytes) and first[:4] == b'\x89PNG', "Should send PNG bytes"
+        assert first != second, "Each challenge should get a freshly drawn image"
+        with Image.open(BytesIO(second)) as image:
+            assert image.mode == 'P', f"Should be palettized, got {image.mode}"
+            assert image.size == (200, 80), f"Unexpected size {image.size}"
+
+        answer = manager.cache.get("captcha_12345")
+        assert len(answer) == 4 and answer.isdigit(), f"Unexpected answer {answer!r}"
+        assert manager.verify_captcha(12345, answer), "Stored answer should verify"
+        print(f"✅ Image captcha rendered and sent ({len(second)} bytes)")
+        return True
+    except Exception as e:
+        print(f"❌ CaptchaManager image captcha test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
 def main():
     """Run all tests."""
     print("=" * 60)
@@ -284,7 +417,8 @@ def main():
         "Imports": test_imports(),
         "Database Migration": test_database_migration(),
         "CaptchaManager": test_captcha_manager(),
-        "Image Captcha": test_image_captcha()
+        "Image Captcha": test_image_captcha(),
+        "CaptchaManager Image Captcha": test_image_captcha_manager()
     }
 
     print("\n" + "=" * 60)